@@ -14,9 +14,12 @@ instructions). The complete version is in Solution/Python/hosted_agent/main.py.
 import asyncio
 import logging
 import os
+import re
+from collections import OrderedDict
 
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
+import httpx
+from azure.ai.projects.aio import AIProjectClient
+from azure.identity.aio import DefaultAzureCredential
 
 from azure.ai.agentserver.responses import (
     CreateResponse,
@@ -37,14 +40,33 @@ logger = logging.getLogger(__name__)
 _endpoint = os.environ["FOUNDRY_PROJECT_ENDPOINT"]
 _model = os.environ["AZURE_AI_MODEL_DEPLOYMENT_NAME"]
 
+# How many model calls this container runs at once. Turns beyond the limit wait
+# for a free slot instead of opening ever more connections to the model.
+_max_concurrent_calls = int(os.environ.get("MAX_CONCURRENT_MODEL_CALLS", "16"))
+
+# One pooled HTTP client for every model call, so turns reuse warm TLS
+# connections rather than each paying for its own handshake.
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=_max_concurrent_calls,
+        max_keepalive_connections=_max_concurrent_calls,
+    ),
+    timeout=httpx.Timeout(120.0, connect=10.0),
+)
+
 # TODO: Create the Responses client that calls your Foundry model deployment.
 #   Build an AIProjectClient(endpoint=_endpoint, credential=DefaultAzureCredential()),
-#   then call .get_openai_client().responses on it.
+#   then call .get_openai_client(http_client=_http_client).responses on it.
 _responses_client = None
+_model_slots = asyncio.Semaphore(_max_concurrent_calls)
 
-# The hosting library. It runs the web server and manages conversation history.
+# How many earlier conversation items each turn can draw on.
+_HISTORY_ITEM_LIMIT = 20
+
+# The hosting library. It runs the web server and manages conversation history,
+# stored in Foundry when hosted and in memory locally.
 app = ResponsesAgentServerHost(
-    options=ResponsesServerOptions(default_fetch_history_count=20),
+    options=ResponsesServerOptions(default_fetch_history_count=_HISTORY_ITEM_LIMIT),
 )
 
 # The same assistant instructions you used for your prompt agents.
@@ -60,19 +82,133 @@ _ROLE_MAP = {
     MessageContentInputTextContent: "user",
 }
 
-
-def _build_input(current_input: str, history: list) -> list:
-    """Convert platform history + the current message into Responses API input."""
+# How much earlier conversation is sent with each turn, in approximate tokens.
+# The newest turns are kept whole; the first one that doesn't fit is cut short
+# and anything older is left out, so a long document pasted early on isn't
+# re-sent to the model on every request.
+_history_token_budget = int(os.environ.get("HISTORY_TOKEN_BUDGET", "4000"))
+
+# A cut-down message shorter than this isn't worth sending.
+_MIN_TRUNCATED_TOKENS = 50
+
+# Words and punctuation marks - close enough to model tokens to budget with,
+# without pulling a tokenizer into the container.
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# History items never change, so each one is counted once, keyed by item id.
+_token_counts: OrderedDict = OrderedDict()
+_TOKEN_COUNT_CACHE_SIZE = 10_000
+
+
+def _count_tokens(key: str, text: str) -> int:
+    """Approximate token count of *text*, cached by history item *key*."""
+    if key in _token_counts:
+        _token_counts.move_to_end(key)
+        return _token_counts[key]
+    count = _token_counts[key] = len(_TOKEN_PATTERN.findall(text))
+    if len(_token_counts) > _TOKEN_COUNT_CACHE_SIZE:
+        _token_counts.popitem(last=False)
+    return count
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Keep the first *max_tokens* tokens of *text*, marking the cut."""
+    for index, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+        if index == max_tokens:
+            return text[: match.start()].rstrip() + " [...truncated]"
+    return text
+
+
+def _to_messages(item) -> list:
+    """Convert one history item into [(role, text), ...]."""
+    messages = []
+    for content in getattr(item, "content", None) or []:
+        role = _ROLE_MAP.get(type(content))
+        if role and content.text:
+            messages.append((role, content.text))
+    return messages
+
+
+async def _load_history(context: ResponseContext) -> list:
+    """Return the conversation so far as (key, role, text) messages.
+
+    The host fetches up to _HISTORY_ITEM_LIMIT earlier items; _build_input then
+    keeps as many of the newest as fit the token budget. Keys are item ids, so
+    each item's tokens are only counted once.
+    """
+    return [
+        (f"{item.id}:{index}", role, text)
+        for item in await context.get_history()
+        for index, (role, text) in enumerate(_to_messages(item))
+    ]
+
+
+def _build_input(current_input: str, messages: list) -> list:
+    """Convert history messages + the current message into Responses API input.
+
+    History is added newest first until HISTORY_TOKEN_BUDGET is spent, so the
+    prompt stays the same size however long the conversation gets.
+    """
     items = []
-    for item in history:
-        for content in getattr(item, "content", None) or []:
-            role = _ROLE_MAP.get(type(content))
-            if role and content.text:
-                items.append({"role": role, "content": content.text})
+    remaining = _history_token_budget
+    for key, role, text in reversed(messages):
+        tokens = _count_tokens(key, text)
+        if tokens > remaining:
+            if remaining >= _MIN_TRUNCATED_TOKENS:
+                items.append({"role": role, "content": _truncate(text, remaining)})
+            break
+        items.append({"role": role, "content": text})
+        remaining -= tokens
+    items.reverse()
+
     items.append({"role": "user", "content": current_input})
     return items
 
 
+async def _until_cancelled(call, cancellation_signal: asyncio.Event):
+    """Await *call*, aborting it as soon as the caller cancels the response.
+
+    Cancelling the task closes its HTTP request, so the model stops generating
+    instead of finishing an answer nobody will read.
+    """
+    task = asyncio.ensure_future(call)
+    cancelled = asyncio.ensure_future(cancellation_signal.wait())
+    try:
+        await asyncio.wait({task, cancelled}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        cancelled.cancel()
+        if not task.done():
+            task.cancel()
+    if not task.done() or task.cancelled():
+        raise asyncio.CancelledError()
+    return task.result()
+
+
+async def _stream_model_text(input_items: list, cancellation_signal: asyncio.Event):
+    """Yield the model's reply as text deltas, as soon as each one arrives."""
+    async with _model_slots:
+        stream = await _until_cancelled(
+            _responses_client.create(
+                model=_model,
+                instructions=_SYSTEM_PROMPT,
+                input=input_items,
+                store=False,
+                stream=True,
+            ),
+            cancellation_signal,
+        )
+        try:
+            async for event in stream:
+                if cancellation_signal.is_set():
+                    break
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+        finally:
+            # Closing the stream ends the HTTP request, so a cancelled turn
+            # stops the model mid-answer.
+            await stream.close()
+
+
 @app.response_handler
 async def handler(
     request: CreateResponse,
@@ -81,22 +217,31 @@ async def handler(
 ):
     """Handle one turn: forward the user's message to the model and reply."""
     user_input = await context.get_input_text() or "Hello!"
-    history = await context.get_history()
+    history = await _load_history(context)
     input_items = _build_input(user_input, history)
 
+    # A client that asked for a stream gets the reply token by token, as the
+    # model writes it. Everyone else gets the whole reply in one message.
+    if context.mode_flags.stream:
+        return TextResponse(
+            context, request, text=_stream_model_text(input_items, _cancellation_signal)
+        )
+
     # TODO: Call the model with the Caldova system prompt and the input items,
-    #   then return the reply. The Responses client is synchronous, so run it off
-    #   the event loop with run_in_executor:
+    #   then return the reply. The Responses client is async, so await the call -
+    #   inside a _model_slots slot, and wrapped in _until_cancelled so a cancelled
+    #   request stops the model:
     #
-    #   response = await asyncio.get_running_loop().run_in_executor(
-    #       None,
-    #       lambda: _responses_client.create(
-    #           model=_model,
-    #           instructions=_SYSTEM_PROMPT,
-    #           input=input_items,
-    #           store=False,
-    #       ),
-    #   )
+    #   async with _model_slots:
+    #       response = await _until_cancelled(
+    #           _responses_client.create(
+    #               model=_model,
+    #               instructions=_SYSTEM_PROMPT,
+    #               input=input_items,
+    #               store=False,
+    #           ),
+    #           _cancellation_signal,
+    #       )
     #   return TextResponse(context, request, text=response.output_text)
     raise NotImplementedError("Complete the handler to call the model and return a reply.")
 
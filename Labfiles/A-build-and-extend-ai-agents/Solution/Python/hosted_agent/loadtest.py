@@ -0,0 +1,324 @@
+"""Load-test the hosted agent offline, against a stub of the Responses API.
+
+How many conversations can one hosted_agent container keep up with? This
+script answers that on your own machine, with no Azure resources and no model
+spend. It starts three things:
+
+    stub     a fake Responses API that "generates" a reply at a set latency
+             and token rate, so results don't depend on a real model
+    agent    main.py, unchanged, with its model client pointed at the stub
+    driver   many concurrent multi-turn conversations sent to the agent over
+             its own HTTP surface (POST /responses), chained by
+             previous_response_id the way a real client would
+
+Run it from the hosted_agent folder, with the folder's requirements installed:
+
+    python loadtest.py
+    python loadtest.py --conversations 200 --turns 5 --latency 0.8 --token-rate 40
+    python loadtest.py --stream
+
+When the run finishes it reports throughput (turns per second), p50/p95/p99
+turn latency, errors, and the agent process's resident memory (RSS).
+Memory is read from /proc, so RSS is only reported on Linux.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import runpy
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+_HERE = Path(__file__).resolve().parent
+
+# --------------------------------------------------------------------------
+# Stub Responses API
+# --------------------------------------------------------------------------
+
+
+def _response_body(text: str) -> dict:
+    """A completed Responses API object carrying *text* as its only message."""
+    return {
+        "id": f"resp_stub_{time.monotonic_ns()}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": "stub",
+        "status": "completed",
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_stub",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+    }
+
+
+def serve_stub(port: int, latency: float, token_rate: float, reply_tokens: int) -> None:
+    """Serve a fake /openai/v1/responses that answers like a slow model would.
+
+    The first token arrives after *latency* seconds, then *reply_tokens* more
+    follow at *token_rate* tokens per second.
+    """
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    words = ["capacity "] * reply_tokens
+    interval = 1.0 / token_rate
+
+    def sse(event: dict) -> str:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    async def responses(request):
+        body = await request.json()
+        if not body.get("stream"):
+            await asyncio.sleep(latency + reply_tokens * interval)
+            return JSONResponse(_response_body("".join(words)))
+
+        async def events():
+            created = _response_body("")
+            created.update(status="in_progress", output=[])
+            yield sse({"type": "response.created", "sequence_number": 0, "response": created})
+            await asyncio.sleep(latency)
+            for number, word in enumerate(words, start=1):
+                yield sse({
+                    "type": "response.output_text.delta",
+                    "sequence_number": number,
+                    "item_id": "msg_stub",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": word,
+                    "logprobs": [],
+                })
+                await asyncio.sleep(interval)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/openai/v1/responses", responses, methods=["POST"])])
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.accesslog = None
+    asyncio.run(serve(app, config))
+
+
+# --------------------------------------------------------------------------
+# The agent under test
+# --------------------------------------------------------------------------
+
+
+def serve_agent(stub_url: str) -> None:
+    """Run main.py unchanged, with its model client pointed at the stub.
+
+    main.py builds its client with AIProjectClient.get_openai_client(). Swapping
+    that one method for a plain AsyncOpenAI aimed at the stub keeps everything
+    else - connection pool, concurrency limit, history handling - as shipped.
+    """
+    from azure.ai.projects.aio import AIProjectClient
+    from openai import AsyncOpenAI
+
+    def stub_client(self, **kwargs):
+        return AsyncOpenAI(
+            base_url=f"{stub_url}/openai/v1",
+            api_key="stub",
+            http_client=kwargs.get("http_client"),
+        )
+
+    AIProjectClient.get_openai_client = stub_client
+    runpy.run_path(str(_HERE / "main.py"), run_name="__main__")
+
+
+# --------------------------------------------------------------------------
+# Load driver
+# --------------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float | None:
+    """Resident memory of *pid* in MB, or None where /proc isn't available."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _wait_until_ready(client: httpx.AsyncClient, url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+async def _conversation(
+    client: httpx.AsyncClient, agent_url: str, turns: int, stream: bool, latencies: list, errors: list
+) -> None:
+    """Send *turns* chained questions, recording each turn's latency."""
+    previous_id = None
+    for turn in range(turns):
+        body = {"input": f"Question {turn + 1}: what capacity is free next week?", "stream": stream}
+        if previous_id:
+            body["previous_response_id"] = previous_id
+        start = time.perf_counter()
+        try:
+            if stream:
+                async with client.stream("POST", f"{agent_url}/responses", json=body) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if line.startswith("data:"):
+                            event = json.loads(line[len("data:"):])
+                            if event.get("type") == "response.completed":
+                                previous_id = event["response"]["id"]
+            else:
+                response = await client.post(f"{agent_url}/responses", json=body)
+                response.raise_for_status()
+                previous_id = response.json()["id"]
+        except (httpx.HTTPError, KeyError, ValueError) as ex:
+            errors.append(f"{type(ex).__name__}: {ex}")
+            return
+        latencies.append(time.perf_counter() - start)
+
+
+async def _sample_rss(pid: int, samples: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = _rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def drive(args, agent_url: str, agent_pid: int) -> None:
+    limits = httpx.Limits(max_connections=args.conversations, max_keepalive_connections=args.conversations)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(300.0)) as client:
+        await _wait_until_ready(client, f"{agent_url}/readiness")
+        idle_rss = _rss_mb(agent_pid)
+
+        latencies, errors, rss_samples = [], [], []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_rss(agent_pid, rss_samples, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _conversation(client, agent_url, args.turns, args.stream, latencies, errors)
+            for _ in range(args.conversations)
+        ))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await sampler
+
+    print(f"\nconversations   {args.conversations} x {args.turns} turns"
+          f" ({'streaming' if args.stream else 'non-streaming'})")
+    print(f"stub model      {args.latency:.2f}s to first token, {args.token_rate:g} tokens/s,"
+          f" {args.reply_tokens} tokens per reply")
+    print(f"elapsed         {elapsed:.1f}s")
+    print(f"turns           {len(latencies)} ok, {len(errors)} failed")
+    if latencies:
+        print(f"throughput      {len(latencies) / elapsed:.1f} turns/s")
+        print(f"latency p50     {statistics.median(latencies):.2f}s")
+        print(f"latency p95     {_percentile(latencies, 95):.2f}s")
+        print(f"latency p99     {_percentile(latencies, 99):.2f}s")
+    if rss_samples:
+        print(f"agent RSS       {idle_rss:.0f} MB idle, {max(rss_samples):.0f} MB peak")
+    else:
+        print("agent RSS       not available on this platform")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=50, help="concurrent conversations (default 50)")
+    parser.add_argument("--turns", type=int, default=4, help="turns per conversation (default 4)")
+    parser.add_argument("--stream", action="store_true", help="request streamed replies")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds to first token (default 0.5)")
+    parser.add_argument("--token-rate", type=float, default=50, help="stub tokens per second (default 50)")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="stub tokens per reply (default 40)")
+    parser.add_argument("--role", choices=["driver", "stub", "agent"], default="driver", help=argparse.SUPPRESS)
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == "stub":
+        serve_stub(args.port, args.latency, args.token_rate, args.reply_tokens)
+        return
+    if args.role == "agent":
+        serve_agent(args.stub_url)
+        return
+
+    stub_port, agent_port = _free_port(), _free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    agent_url = f"http://127.0.0.1:{agent_port}"
+
+    # The agent needs its usual settings, but nothing here may reach Azure.
+    agent_env = {
+        key: value for key, value in os.environ.items()
+        if key not in ("FOUNDRY_HOSTING_ENVIRONMENT", "APPLICATIONINSIGHTS_CONNECTION_STRING")
+    }
+    agent_env.update(
+        FOUNDRY_PROJECT_ENDPOINT="https://loadtest.invalid/api/projects/loadtest",
+        AZURE_AI_MODEL_DEPLOYMENT_NAME="stub",
+        PORT=str(agent_port),
+    )
+
+    stub_args = [
+        "--latency", str(args.latency),
+        "--token-rate", str(args.token_rate),
+        "--reply-tokens", str(args.reply_tokens),
+    ]
+    stub = subprocess.Popen(
+        [sys.executable, __file__, "--role", "stub", "--port", str(stub_port), *stub_args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    agent = subprocess.Popen(
+        [sys.executable, __file__, "--role", "agent", "--stub-url", stub_url],
+        env=agent_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(drive(args, agent_url, agent.pid))
+    finally:
+        for process in (agent, stub):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure time-to-first-byte of the hosted agent, streaming vs. non-streaming.
+
+Start the agent locally first (`azd ai agent run`, or `python main.py`), then run
+this from the hosted_agent folder in a second terminal:
+
+    python ttfb_check.py
+    python ttfb_check.py --url http://localhost:8088 --runs 5
+
+For each mode it sends the same question to the local /responses endpoint and
+reports two numbers:
+
+    first byte   when the first bytes of the HTTP body arrived
+    first text   when the first piece of the answer's text arrived
+
+With "stream": false both wait for the model to finish the whole answer. With
+"stream": true the first text arrives as soon as the model writes its first
+token, which is what a user actually notices.
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import httpx
+
+_QUESTION = "How long does review take for a capacity request? Explain the steps."
+
+
+def _measure(client: httpx.Client, url: str, stream: bool) -> tuple[float, float, float]:
+    """Send one request; return (first byte, first text, total) in seconds."""
+    body = {"input": _QUESTION, "stream": stream}
+    start = time.perf_counter()
+    first_byte = first_text = None
+
+    with client.stream("POST", f"{url}/responses", json=body) as response:
+        response.raise_for_status()
+        if stream:
+            for line in response.iter_lines():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if first_text is None and event.get("type") == "response.output_text.delta":
+                    first_text = time.perf_counter() - start
+        else:
+            for _ in response.iter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+            # The whole answer arrives in one JSON body, so the first text is
+            # only readable once the body is complete.
+            first_text = time.perf_counter() - start
+
+    total = time.perf_counter() - start
+    return first_byte or total, first_text or total, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8088", help="base URL of the running agent")
+    parser.add_argument("--runs", type=int, default=3, help="requests per mode (default 3)")
+    args = parser.parse_args()
+
+    print(f"Measuring {args.url}/responses, {args.runs} run(s) per mode\n")
+    print(f"{'mode':<14}{'first byte':>12}{'first text':>12}{'total':>10}")
+
+    with httpx.Client(timeout=httpx.Timeout(120.0, connect=10.0)) as client:
+        for stream in (False, True):
+            results = [_measure(client, args.url.rstrip("/"), stream) for _ in range(args.runs)]
+            first_byte, first_text, total = (statistics.median(col) for col in zip(*results))
+            mode = "streaming" if stream else "non-streaming"
+            print(f"{mode:<14}{first_byte:>11.2f}s{first_text:>11.2f}s{total:>9.2f}s")
+
+    print("\nValues are medians. Streaming should show a much lower 'first text'.")
+
+
+if __name__ == "__main__":
+    main()
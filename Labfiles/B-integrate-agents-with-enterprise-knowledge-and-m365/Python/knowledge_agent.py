@@ -1,8 +1,14 @@
+import json
 import os
+import tempfile
+from collections import deque
 from dotenv import load_dotenv
 from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient
 
+from local_search import search_knowledge_base
+from mcp_approvals import ApprovalEngine
+
 # Load environment variables
 load_dotenv()
 project_endpoint = os.getenv("PROJECT_ENDPOINT")
@@ -15,6 +21,32 @@ if not project_endpoint or not agent_name:
 print(f"Connecting to project: {project_endpoint}")
 print(f"Using agent: {agent_name}\n")
 
+
+def ask_for_approval(approval_request):
+    """
+    Show an MCP approval request and ask the user whether to allow it.
+    """
+    print(f"[Approval required for: {approval_request.name}]\n")
+    print(f"Server: {approval_request.server_label}")
+
+    # Parse and display the arguments (optional, for transparency)
+    try:
+        args = json.loads(approval_request.arguments)
+        print(f"Arguments: {json.dumps(args, indent=2)}\n")
+    except Exception:
+        print(f"Arguments: {approval_request.arguments}\n")
+
+    # Prompt user for approval. A yes also covers later calls to the same tool.
+    approval_input = input("Approve this action for the rest of this session? (yes/no): ").strip().lower()
+
+    if approval_input in ['yes', 'y']:
+        print("Approving action...\n")
+        return True
+
+    print("Action denied.\n")
+    return False
+
+
 # TODO: Connect to the project and create a conversation
 # Add your code here to:
 # 1. Create DefaultAzureCredential
@@ -22,10 +54,54 @@ print(f"Using agent: {agent_name}\n")
 # 3. Get the OpenAI client
 # 4. Get the agent by name
 # 5. Create a new conversation
+# 6. Create an ApprovalEngine that asks the user with ask_for_approval and runs
+#    search_knowledge_base when the agent calls it
+
+
+class ConversationHistory:
+    """
+    Client-side conversation history with a fixed memory footprint.
+
+    The most recent turns are kept in memory. Older turns are appended to a
+    temporary JSONL file as they fall out, so a session left running all day
+    (a kiosk, say) doesn't grow without bound. close() deletes the file.
+    """
+
+    def __init__(self, max_in_memory=20):
+        handle, self.path = tempfile.mkstemp(prefix="conversation_history_", suffix=".jsonl")
+        os.close(handle)
+        self.max_in_memory = max_in_memory
+        self.recent = deque()
+        self.spilled = 0
+
+    def append(self, turn):
+        self.recent.append(turn)
+        if len(self.recent) > self.max_in_memory:
+            with open(self.path, "a", encoding="utf-8") as history_file:
+                history_file.write(json.dumps(self.recent.popleft()) + "\n")
+            self.spilled += 1
+
+    def __len__(self):
+        return self.spilled + len(self.recent)
+
+    def __iter__(self):
+        """Yield every turn, oldest first, reading spilled turns one at a time."""
+        if self.spilled:
+            with open(self.path, encoding="utf-8") as history_file:
+                for line in history_file:
+                    yield json.loads(line)
+        yield from list(self.recent)
+
+    def close(self):
+        """Delete the file of older turns."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
 
 
 # Conversation history for context (client-side tracking)
-conversation_history = []
+conversation_history = ConversationHistory()
 
 
 def send_message_to_agent(user_message):
@@ -39,7 +115,7 @@ def send_message_to_agent(user_message):
         # Add your code here to:
         # 1. Add the user message to the conversation using conversations.items.create()
         # 2. Create a response using responses.create() with agent reference
-        # 3. Handle any MCP approval request for the Foundry IQ knowledge tool
+        # 3. Answer any MCP approval requests and local search calls with approvals.resolve()
         # 4. Extract and display the response text
         # Your code will go here
 
@@ -72,19 +148,24 @@ def send_message_to_agent(user_message):
         return None
 
 
-def display_conversation_history():
+def display_conversation_history(page_size=10):
     """
-    Display the full conversation history.
+    Display the full conversation history, a page at a time.
     """
     print("\n" + "=" * 60)
-    print("CONVERSATION HISTORY")
+    print(f"CONVERSATION HISTORY ({len(conversation_history)} turns)")
     print("=" * 60 + "\n")
 
-    for turn in conversation_history:
+    for number, turn in enumerate(conversation_history, start=1):
         role = turn["role"].upper()
         content = turn["content"]
         print(f"{role}: {content}\n")
 
+        if number % page_size == 0 and number < len(conversation_history):
+            more = input("-- Press Enter for more, or q to stop -- ").strip().lower()
+            if more == "q":
+                break
+
     print("=" * 60 + "\n")
 
 
@@ -96,29 +177,32 @@ def main():
     print("Ask questions about plant capacity, contract manufacturers, tech transfer, and suppliers.")
     print("Type 'history' to see conversation history, or 'quit' to exit.\n")
 
-    while True:
-        try:
-            user_input = input("You: ").strip()
+    try:
+        while True:
+            try:
+                user_input = input("You: ").strip()
 
-            if not user_input:
-                continue
+                if not user_input:
+                    continue
 
-            if user_input.lower() == 'quit':
-                print("\nEnding conversation...")
-                break
+                if user_input.lower() == 'quit':
+                    print("\nEnding conversation...")
+                    break
 
-            if user_input.lower() == 'history':
-                display_conversation_history()
-                continue
+                if user_input.lower() == 'history':
+                    display_conversation_history()
+                    continue
 
-            # Send message and get response
-            send_message_to_agent(user_input)
+                # Send message and get response
+                send_message_to_agent(user_input)
 
-        except KeyboardInterrupt:
-            print("\n\nInterrupted by user.")
-            break
-        except Exception as e:
-            print(f"\nUnexpected error: {str(e)}\n")
+            except KeyboardInterrupt:
+                print("\n\nInterrupted by user.")
+                break
+            except Exception as e:
+                print(f"\nUnexpected error: {str(e)}\n")
+    finally:
+        conversation_history.close()
 
     print("\nConversation ended.")
 
@@ -8,14 +8,21 @@ Caldova web chat window (caldova_ui.py).
 To keep the browser experience smooth, this variant AUTO-APPROVES the Foundry IQ
 knowledge tool when the agent asks for approval. The console client
 (knowledge_agent.py) shows the interactive yes/no approval flow instead.
+
+Repeated questions are answered from an answer cache (answer_cache.py) instead
+of the agent. The terminal shows the cache's hit rate after each question.
 """
 
 import os
+import time
 from dotenv import load_dotenv
 from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient
 
+from answer_cache import AnswerCache
 from caldova_ui import run_chat_app
+from local_search import search_knowledge_base
+from mcp_approvals import ApprovalEngine
 
 # Load environment variables
 load_dotenv()
@@ -40,44 +47,38 @@ agent = project_client.agents.get(agent_name=agent_name)
 # One shared conversation for the browser session
 conversation = openai_client.conversations.create(items=[])
 
+# Auto-approve every Foundry IQ knowledge-tool approval request, and run the
+# local search tool if the agent calls it
+approvals = ApprovalEngine(
+    openai_client, conversation.id, agent.name,
+    decide=lambda request: True,
+    tools={"search_knowledge_base": search_knowledge_base},
+)
 
-def respond(user_message):
-    """Route a chat message to the Foundry IQ agent and return the reply text."""
-    # Add the user's message to the conversation
-    openai_client.conversations.items.create(
-        conversation_id=conversation.id,
-        items=[{"type": "message", "role": "user", "content": user_message}],
-    )
+# Answers to repeated questions, reused for an hour or until the docs change
+answer_cache = AnswerCache(ttl=3600)
 
-    # Ask the agent to respond
-    response = openai_client.responses.create(
-        conversation=conversation.id,
-        extra_body={"agent_reference": {"name": agent.name, "type": "agent_reference"}},
-        input=""
-    )
 
-    # Auto-approve any Foundry IQ knowledge-tool approval request
-    approval_request = None
-    if getattr(response, "output", None):
-        for item in response.output:
-            if getattr(item, "type", None) == "mcp_approval_request":
-                approval_request = item
-                break
-
-    if approval_request:
-        openai_client.conversations.items.create(
-            conversation_id=conversation.id,
-            items=[{
-                "type": "mcp_approval_response",
-                "approval_request_id": approval_request.id,
-                "approve": True,
-            }],
-        )
-        response = openai_client.responses.create(
-            conversation=conversation.id,
-            extra_body={"agent_reference": {"name": agent.name, "type": "agent_reference"}},
-            input=""
-        )
+def respond(user_message):
+    """Route a chat message to the Foundry IQ agent and return the reply text."""
+    cached = answer_cache.get(user_message)
+
+    # Add the user's message to the conversation. A cached answer is added too,
+    # so follow-up questions still have the whole exchange as context.
+    items = [{"type": "message", "role": "user", "content": user_message}]
+    if cached is not None:
+        items.append({"type": "message", "role": "assistant", "content": cached})
+    openai_client.conversations.items.create(conversation_id=conversation.id, items=items)
+
+    if cached is not None:
+        print(f"[cached] {answer_cache.report()}")
+        return cached
+
+    # Ask the agent to respond, answering every approval request it makes
+    start = time.perf_counter()
+    response = approvals.resolve(approvals.create_response())
+    answer_cache.put(user_message, response.output_text, time.perf_counter() - start)
+    print(answer_cache.report())
 
     return response.output_text or "No response received."
 
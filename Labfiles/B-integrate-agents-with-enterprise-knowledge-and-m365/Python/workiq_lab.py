@@ -12,25 +12,98 @@ Scenarios covered:
 5. Custom Query - Ask your own workplace questions
 
 Run this single file to explore all Work IQ capabilities.
+
+To run a list of queries without the menu (for example, a nightly digest),
+use batch mode. It runs the queries concurrently and writes each result, with
+its timing, to a JSONL file:
+
+    python workiq_lab.py --batch                       # the four scenarios, default inputs
+    python workiq_lab.py --batch --queries digest.txt  # one query per line
+    python workiq_lab.py --batch --concurrency 4 --output digest.jsonl
 """
 
+import argparse
 import os
 import time
 import json
-import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from dotenv import load_dotenv
 from azure.ai.projects import AIProjectClient
 from azure.ai.projects.models import PromptAgentDefinition, Tool, FunctionTool
 from azure.identity import DefaultAzureCredential
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp import StdioServerParameters
 from openai.types.responses.response_input_param import FunctionCallOutput, ResponseInputParam
 
+from workiq_mcp import WorkIQSessionPool, load_cached_tools, save_cached_tools, tools_as_json
+
 # Load environment variables
 load_dotenv()
 
+# Work IQ's tool list, saved per Work IQ version so startup doesn't wait on the server
+TOOL_CACHE_PATH = Path(__file__).resolve().parent / ".workiq_tools_cache.json"
+
+# Longest a single Work IQ tool call may take, and most rounds of tool calls per query
+TOOL_CALL_TIMEOUT = 60
+MAX_TOOL_ROUNDS = 10
+
+# Scenario queries, shared by the interactive menu and batch mode
+MEETING_PREP_QUERY = """Help me prepare for {meeting_topic}. Please:
+1. Find the meeting details (time, attendees, agenda)
+2. Search for recent emails about this topic
+3. Look for previous meetings on this topic
+4. Summarize key points and decisions I should know
+5. Suggest discussion points or questions
+
+Provide a concise prep summary with sources."""
+
+PROJECT_STATUS_QUERY = """Give me a status update on {project_name}. Please:
+1. Search recent emails and Teams messages about this project
+2. Find related meetings and their outcomes
+3. Identify recent decisions and changes
+4. List any blockers or issues mentioned
+5. Summarize next steps and deadlines
+
+Provide a concise status report with sources and dates."""
+
+ACTION_ITEMS_QUERY = """Find my open action items and tasks from {time_filter}. Please:
+1. Search meeting notes for assigned action items
+2. Look for task-related emails sent to me
+3. Check Teams messages where I was mentioned or assigned tasks
+4. Identify items with deadlines or due dates
+5. Categorize by urgency if possible
+
+Provide a prioritized list with sources, deadlines, and who assigned each item."""
+
+COMBINED_INTELLIGENCE_QUERY = """Research {topic} using both workplace data and knowledge base. Please:
+
+FROM WORKPLACE DATA (Work IQ):
+1. Search recent emails and messages about this topic
+2. Find relevant meetings and discussions
+3. Identify who has been involved and what was decided
+
+FROM KNOWLEDGE BASE (Foundry IQ):
+4. Search official documentation
+5. Find policies, guidelines, or procedures
+
+SYNTHESIS:
+6. Compare workplace discussions with official documentation
+7. Identify any gaps or inconsistencies
+8. Provide a comprehensive summary with sources from both
+
+Label each piece of information with its source (workplace or knowledge base)."""
+
+# What batch mode runs when no queries file is given: each scenario with its default input
+DEFAULT_BATCH_QUERIES = [
+    ("Meeting Prep", MEETING_PREP_QUERY.format(meeting_topic="my next meeting")),
+    ("Project Status", PROJECT_STATUS_QUERY.format(project_name="current projects")),
+    ("Action Items", ACTION_ITEMS_QUERY.format(time_filter="the past week")),
+    ("Combined Intelligence", COMBINED_INTELLIGENCE_QUERY.format(topic="our capacity request and transfer policies")),
+]
+
 class WorkIQLab:
-    def __init__(self):
+    def __init__(self, session_pool_size=3):
         """Initialize the lab with Microsoft Foundry connection."""
         self.project_endpoint = os.getenv("PROJECT_ENDPOINT")
         self.model_deployment = os.getenv("MODEL_DEPLOYMENT_NAME", "gpt-5")
@@ -47,6 +120,9 @@ class WorkIQLab:
         self.workiq_client = None
         self.agent = None
         self.workiq_server_params = None
+        self.workiq_sessions = None
+        self.session_pool_size = session_pool_size
+        self.workiq_version = None
 
     def validate_workiq_setup(self):
         """Check if Work IQ is installed and accessible."""
@@ -67,6 +143,7 @@ class WorkIQLab:
             )
 
             if result.returncode == 0:
+                self.workiq_version = result.stdout.strip()
                 print("[OK] Work IQ is installed")
                 print(f"   Version: {result.stdout.strip()}\n")
                 return True
@@ -112,6 +189,11 @@ class WorkIQLab:
                 args=["-y", "@microsoft/workiq", "mcp"]
             )
 
+            # Keep Work IQ MCP sessions open for the whole lab, so each tool
+            # call doesn't start a new server process
+            self.workiq_sessions = WorkIQSessionPool(self.workiq_server_params, size=self.session_pool_size)
+            self.workiq_sessions.start()
+
             # Get available tools from Work IQ
             print("[OK] Connected to Microsoft Foundry and Work IQ MCP\n")
 
@@ -130,24 +212,48 @@ class WorkIQLab:
             return False
 
     def _get_workiq_tools(self):
-        """Fetch tools from Work IQ MCP server."""
-        async def _fetch():
-            async with stdio_client(self.workiq_server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    tools_result = await session.list_tools()
-                    return tools_result.tools
-        return asyncio.run(_fetch())
-
-    def _call_workiq_tool(self, tool_name, kwargs):
-        """Execute a Work IQ tool via MCP and return result."""
-        async def _execute():
-            async with stdio_client(self.workiq_server_params) as (read, write):
-                async with ClientSession(read, write) as session:
-                    await session.initialize()
-                    result = await session.call_tool(tool_name, kwargs)
-                    return result
-        return asyncio.run(_execute())
+        """Fetch tools from Work IQ MCP server, or from the cache for this Work IQ version."""
+        cached = load_cached_tools(TOOL_CACHE_PATH, self.workiq_version)
+        if cached is not None:
+            print("   Using the cached Work IQ tool list (checking it in the background)")
+            threading.Thread(target=self._revalidate_tool_cache, args=(cached,), daemon=True).start()
+            return cached
+
+        tools = self.workiq_sessions.list_tools()
+        save_cached_tools(TOOL_CACHE_PATH, self.workiq_version, tools)
+        return tools
+
+    def _revalidate_tool_cache(self, cached):
+        """Compare the cached tool list with the server's, and save it if it changed."""
+        try:
+            tools = self.workiq_sessions.list_tools()
+        except Exception:
+            return  # keep the cache; the next run checks again
+        if tools_as_json(tools) != tools_as_json(cached):
+            save_cached_tools(TOOL_CACHE_PATH, self.workiq_version, tools)
+            print("\n[INFO] Work IQ's tools have changed since they were cached. The new list")
+            print("   is saved and the agent uses it the next time you start the lab.")
+
+    def _call_workiq_tools(self, calls):
+        """Execute several Work IQ tool calls at once and return each one's output text, in order."""
+        outputs = []
+        for result in self.workiq_sessions.call_tools(calls, timeout=TOOL_CALL_TIMEOUT):
+            if isinstance(result, TimeoutError):
+                outputs.append(json.dumps({"error": f"Work IQ tool timed out after {TOOL_CALL_TIMEOUT}s"}))
+            elif isinstance(result, BaseException):
+                outputs.append(json.dumps({"error": f"Work IQ tool failed: {result}"}))
+            else:
+                # A result can hold several parts, or none, and not all of them text
+                text = "\n".join(
+                    part.text for part in result.content or [] if getattr(part, "type", None) == "text"
+                )
+                if result.isError:
+                    outputs.append(json.dumps({"error": f"Work IQ tool failed: {text or 'no details'}"}))
+                elif not text:
+                    outputs.append(json.dumps({"error": "Work IQ tool returned no text"}))
+                else:
+                    outputs.append(text)
+        return outputs
 
     def _create_workplace_agent(self):
         """Create the workplace intelligence agent with Work IQ tools."""
@@ -196,6 +302,59 @@ Guidelines:
             print(f"[ERROR] Failed to create agent: {e}")
             raise
 
+    def _run_query(self, query, log=print):
+        """Run a query through the agent and its Work IQ tool loop.
+
+        Returns the final response and the number of tool calls made. Progress
+        lines go to *log*.
+        """
+        # Create conversation
+        conversation = self.openai_client.conversations.create(
+            items=[{"type": "message", "role": "user", "content": query}]
+        )
+
+        # Create response with agent
+        response = self.openai_client.responses.create(
+            conversation=conversation.id,
+            extra_body={"agent_reference": {"name": self.agent.name, "type": "agent_reference"}}
+        )
+
+        # Tool call loop, with a limit so a runaway loop can't hang the app
+        tool_calls = 0
+        for _ in range(MAX_TOOL_ROUNDS):
+            # Check for failures
+            if response.status == "failed":
+                return response, tool_calls
+
+            # No tool calls - we have the final response
+            function_calls = [item for item in response.output if item.type == "function_call"]
+            if not function_calls:
+                return response, tool_calls
+
+            for item in function_calls:
+                log(f"   [tool] Calling Work IQ tool: {item.name}")
+
+            # Call every tool the agent asked for at once via MCP
+            outputs = self._call_workiq_tools(
+                [(item.name, json.loads(item.arguments)) for item in function_calls]
+            )
+            tool_calls += len(function_calls)
+
+            # Send the results back, each matched to its call_id, and continue the loop
+            input_list: ResponseInputParam = [
+                FunctionCallOutput(type="function_call_output", call_id=item.call_id, output=output)
+                for item, output in zip(function_calls, outputs)
+            ]
+            response = self.openai_client.responses.create(
+                input=input_list,
+                previous_response_id=response.id,
+                extra_body={
+                    "agent_reference": {"name": self.agent.name, "type": "agent_reference"}
+                }
+            )
+
+        raise RuntimeError(f"Agent was still calling tools after {MAX_TOOL_ROUNDS} rounds")
+
     def _execute_query(self, query, scenario_name="Query"):
         """Execute a query against the workplace agent."""
         try:
@@ -205,57 +364,10 @@ Guidelines:
             print(f"\nQuery: {query}\n")
             print("Processing with Work IQ tools...")
 
-            # Create conversation
-            conversation = self.openai_client.conversations.create(
-                items=[{"type": "message", "role": "user", "content": query}]
-            )
-
-            # Create response with agent
-            response = self.openai_client.responses.create(
-                conversation=conversation.id,
-                extra_body={"agent_reference": {"name": self.agent.name, "type": "agent_reference"}}
-            )
-
-            # Tool call loop
-            while True:
-                # Check for failures
-                if response.status == "failed":
-                    print(f"[ERROR] Response failed: {response.error}")
-                    return
-
-                input_list: ResponseInputParam = []
-
-                # Process function calls
-                for item in response.output:
-                    if item.type == "function_call":
-                        function_name = item.name
-                        kwargs = json.loads(item.arguments)
-
-                        print(f"   [tool] Calling Work IQ tool: {function_name}")
-
-                        # Call the tool via MCP
-                        result = self._call_workiq_tool(function_name, kwargs)
-
-                        input_list.append(
-                            FunctionCallOutput(
-                                type="function_call_output",
-                                call_id=item.call_id,
-                                output=result.content[0].text,
-                            )
-                        )
-
-                # If there were tool calls, send results back and continue loop
-                if input_list:
-                    response = self.openai_client.responses.create(
-                        input=input_list,
-                        previous_response_id=response.id,
-                        extra_body={
-                            "agent_reference": {"name": self.agent.name, "type": "agent_reference"}
-                        }
-                    )
-                else:
-                    # No tool calls - we have the final response
-                    break
+            response, _ = self._run_query(query)
+            if response.status == "failed":
+                print(f"[ERROR] Response failed: {response.error}")
+                return
 
             # Extract and display final response
             print("\nResponse:")
@@ -315,14 +427,7 @@ Guidelines:
         if not meeting_topic:
             meeting_topic = "my next meeting"
 
-        query = f"""Help me prepare for {meeting_topic}. Please:
-1. Find the meeting details (time, attendees, agenda)
-2. Search for recent emails about this topic
-3. Look for previous meetings on this topic
-4. Summarize key points and decisions I should know
-5. Suggest discussion points or questions
-
-Provide a concise prep summary with sources."""
+        query = MEETING_PREP_QUERY.format(meeting_topic=meeting_topic)
 
         self._execute_query(query, "Meeting Prep")
 
@@ -340,14 +445,7 @@ Provide a concise prep summary with sources."""
         if not project_name:
             project_name = "current projects"
 
-        query = f"""Give me a status update on {project_name}. Please:
-1. Search recent emails and Teams messages about this project
-2. Find related meetings and their outcomes
-3. Identify recent decisions and changes
-4. List any blockers or issues mentioned
-5. Summarize next steps and deadlines
-
-Provide a concise status report with sources and dates."""
+        query = PROJECT_STATUS_QUERY.format(project_name=project_name)
 
         self._execute_query(query, "Project Status")
 
@@ -365,14 +463,7 @@ Provide a concise status report with sources and dates."""
         if not time_filter:
             time_filter = "the past week"
 
-        query = f"""Find my open action items and tasks from {time_filter}. Please:
-1. Search meeting notes for assigned action items
-2. Look for task-related emails sent to me
-3. Check Teams messages where I was mentioned or assigned tasks
-4. Identify items with deadlines or due dates
-5. Categorize by urgency if possible
-
-Provide a prioritized list with sources, deadlines, and who assigned each item."""
+        query = ACTION_ITEMS_QUERY.format(time_filter=time_filter)
 
         self._execute_query(query, "Action Items")
 
@@ -390,23 +481,7 @@ Provide a prioritized list with sources, deadlines, and who assigned each item."
         if not topic:
             topic = "our capacity request and transfer policies"
 
-        query = f"""Research {topic} using both workplace data and knowledge base. Please:
-
-FROM WORKPLACE DATA (Work IQ):
-1. Search recent emails and messages about this topic
-2. Find relevant meetings and discussions
-3. Identify who has been involved and what was decided
-
-FROM KNOWLEDGE BASE (Foundry IQ):
-4. Search official documentation
-5. Find policies, guidelines, or procedures
-
-SYNTHESIS:
-6. Compare workplace discussions with official documentation
-7. Identify any gaps or inconsistencies
-8. Provide a comprehensive summary with sources from both
-
-Label each piece of information with its source (workplace or knowledge base)."""
+        query = COMBINED_INTELLIGENCE_QUERY.format(topic=topic)
 
         self._execute_query(query, "Combined Intelligence")
 
@@ -492,6 +567,65 @@ Label each piece of information with its source (workplace or knowledge base).""
                 print("[OK] Agent deleted")
         except Exception as e:
             print(f"[WARN] Cleanup warning: {e}")
+        finally:
+            if self.workiq_sessions:
+                self.workiq_sessions.close()
+
+    def run_batch(self, queries, output_path, concurrency=3):
+        """Run (name, query) pairs concurrently and write each result to a JSONL file.
+
+        At most *concurrency* queries run at once. They share the lab's agent
+        and Work IQ session pool. Results are written as each query finishes,
+        so a partial run still leaves its finished results on disk.
+        """
+        if not self.connect():
+            print("\n[ERROR] Failed to connect. Please check your configuration.")
+            self.cleanup()
+            return False
+
+        print(f"Running {len(queries)} queries, {concurrency} at a time -> {output_path}\n")
+        lock = threading.Lock()  # one thread at a time prints or writes a result
+        failures = 0
+        started = time.perf_counter()
+
+        def log(name, line):
+            with lock:
+                print(f"[{name}] {line.strip()}")
+
+        def run_one(name, query):
+            record = {"name": name, "query": query, "started_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            query_started = time.perf_counter()
+            try:
+                response, tool_calls = self._run_query(query, log=lambda line: log(name, line))
+                record["tool_calls"] = tool_calls
+                if response.status == "failed":
+                    record.update(status="failed", error=str(response.error))
+                else:
+                    record.update(status="ok", answer=response.output_text)
+            except Exception as e:
+                record.update(status="error", error=str(e))
+            record["seconds"] = round(time.perf_counter() - query_started, 2)
+            with lock:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            return record
+
+        try:
+            with open(output_path, "w", encoding="utf-8") as output:
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    futures = [pool.submit(run_one, name, query) for name, query in queries]
+                    for future in as_completed(futures):
+                        record = future.result()
+                        if record["status"] != "ok":
+                            failures += 1
+                        log(record["name"], f"{record['status']} in {record['seconds']:.1f}s")
+        finally:
+            self.cleanup()
+
+        elapsed = time.perf_counter() - started
+        print(f"\n[OK] {len(queries) - failures} of {len(queries)} queries succeeded in {elapsed:.1f}s")
+        print(f"   Results written to {output_path}")
+        return failures == 0
 
     def run(self):
         """Main application loop."""
@@ -504,6 +638,7 @@ Label each piece of information with its source (workplace or knowledge base).""
         # Connect to services
         if not self.connect():
             print("\n[ERROR] Failed to connect. Please check your configuration.")
+            self.cleanup()
             return
 
         # Main menu loop
@@ -536,6 +671,34 @@ Label each piece of information with its source (workplace or knowledge base).""
         print("\n[OK] Lab complete! Thank you for exploring Work IQ.\n")
 
 
+def load_batch_queries(path):
+    """Read (name, query) pairs: one query per line, or JSON lines with "name" and "query"."""
+    queries = []
+    for number, line in enumerate(Path(path).read_text(encoding="utf-8").splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            entry = json.loads(line)
+            queries.append((entry.get("name", f"Query {number}"), entry["query"]))
+        else:
+            queries.append((f"Query {number}", line))
+    return queries
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Caldova Work IQ lab")
+    parser.add_argument("--batch", action="store_true", help="run queries without the menu and write results to JSONL")
+    parser.add_argument("--queries", help="file of queries for --batch (default: the four scenarios)")
+    parser.add_argument("--output", help="JSONL results file for --batch (default: workiq_batch_<time>.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=3, help="queries to run at once in --batch (default 3)")
+    args = parser.parse_args()
+
+    if args.batch:
+        queries = load_batch_queries(args.queries) if args.queries else DEFAULT_BATCH_QUERIES
+        output_path = args.output or f"workiq_batch_{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+        lab = WorkIQLab(session_pool_size=max(3, args.concurrency))
+        raise SystemExit(0 if lab.run_batch(queries, output_path, args.concurrency) else 1)
+
     lab = WorkIQLab()
     lab.run()
@@ -0,0 +1,255 @@
+"""
+Caldova – Work IQ MCP session pool (provided).
+
+You don't need to edit this file. Every Work IQ tool call goes through an MCP
+session with the Work IQ server, which runs as a Node.js subprocess
+(`npx -y @microsoft/workiq mcp`). Starting that subprocess and completing the
+MCP handshake takes seconds, so opening a new session per tool call makes a
+query that needs 3-5 tool calls mostly wait on Node startup.
+
+This pool keeps sessions open instead:
+
+- Sessions live on a background event loop (its own thread) for as long as the
+  pool is open, so the synchronous lab code can call tools without
+  `asyncio.run` each time.
+- It opens one session up front and more (up to `size`) only when several
+  tool calls run at once. `call_tools` runs a whole batch of calls at once,
+  each with its own timeout.
+- If a session's server process dies, the call is retried once on a fresh
+  session.
+- `close()` shuts every session and its server process down.
+
+It also saves Work IQ's tool list on disk (`load_cached_tools` and
+`save_cached_tools`), keyed by the Work IQ version, so the lab can create its
+agent without waiting for a server to start just to list tools.
+"""
+
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+import anyio
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+from mcp.types import CONNECTION_CLOSED, Tool
+
+# Errors that mean the session's connection to the server is gone, rather
+# than that the tool call itself failed.
+_CONNECTION_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError)
+
+
+def _connection_lost(ex):
+    """True if *ex* means the server process has gone away."""
+    if isinstance(ex, _CONNECTION_ERRORS):
+        return True
+    # The MCP client reports a server that exits mid-call as an MCP error.
+    return getattr(getattr(ex, "error", None), "code", None) == CONNECTION_CLOSED
+
+
+class _Session:
+    """One open MCP session and the task that keeps it open."""
+
+    def __init__(self):
+        self.session = None
+        self.stop = asyncio.Event()
+        self.task = None
+
+
+class WorkIQSessionPool:
+    """A small pool of long-lived MCP sessions with the Work IQ server."""
+
+    def __init__(self, server_params, size=3):
+        self.server_params = server_params
+        self.size = size
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="workiq-mcp", daemon=True)
+        self._idle = None      # asyncio.Queue of idle sessions, created on the loop
+        self._sessions = []    # every open session
+        self._opening = 0      # sessions being opened right now
+        self._closed = False
+
+    def start(self):
+        """Start the background loop and begin opening the first session."""
+        self._thread.start()
+        self._run(self._setup())
+
+    def list_tools(self, timeout=None):
+        """Return the Work IQ server's tools."""
+        return self._run(self._with_session(lambda session: session.list_tools(), timeout)).tools
+
+    def call_tool(self, name, arguments, timeout=None):
+        """Call a Work IQ tool and return its MCP result."""
+        return self._run(self._with_session(lambda session: session.call_tool(name, arguments), timeout))
+
+    def call_tools(self, calls, timeout=None):
+        """Call several tools at once.
+
+        Takes (name, arguments) pairs and returns, in the same order, each
+        call's MCP result - or the exception it raised, such as TimeoutError
+        if it took longer than *timeout* seconds.
+        """
+        async def call_all():
+            return await asyncio.gather(
+                *(self._with_session(lambda session, name=name, arguments=arguments:
+                                     session.call_tool(name, arguments), timeout)
+                  for name, arguments in calls),
+                return_exceptions=True,
+            )
+        return self._run(call_all())
+
+    def close(self):
+        """Close every session and stop the background loop."""
+        if self._closed or not self._thread.is_alive():
+            return
+        self._closed = True
+        self._run(self._close_all())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+
+    def _run(self, coroutine):
+        """Run a coroutine on the pool's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _setup(self):
+        self._idle = asyncio.Queue()
+        # Warm up the first session in the background; the first call waits for it.
+        self._opening += 1
+        asyncio.create_task(self._open_into_idle())
+
+    async def _open_into_idle(self):
+        try:
+            self._idle.put_nowait(await self._open())
+        except Exception:
+            # Wake whoever is waiting; they open a session themselves and see the error.
+            self._idle.put_nowait(None)
+        finally:
+            self._opening -= 1
+
+    async def _open(self):
+        """Start a server process, complete the MCP handshake, and return the session."""
+        entry = _Session()
+        ready = asyncio.get_running_loop().create_future()
+
+        async def hold_open():
+            # The stdio client must be entered and exited in the same task, so
+            # this task owns the session until it's told to stop.
+            try:
+                async with stdio_client(self.server_params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        entry.session = session
+                        ready.set_result(entry)
+                        await entry.stop.wait()
+            except Exception as ex:
+                if not ready.done():
+                    ready.set_exception(ex)
+            finally:
+                if entry in self._sessions:
+                    self._sessions.remove(entry)
+
+        entry.task = asyncio.create_task(hold_open())
+        await ready
+        self._sessions.append(entry)
+        return entry
+
+    async def _acquire(self):
+        """Return an idle session, opening one if every session is busy and there's room."""
+        while True:
+            if self._idle.empty() and self._opening == 0 and len(self._sessions) < self.size:
+                entry = None
+            else:
+                entry = await self._idle.get()
+                if entry is not None and entry.task.done():
+                    continue  # its server exited while it was idle
+            if entry is not None:
+                return entry
+            # None stands in for a session that failed or was discarded: open a replacement.
+            self._opening += 1
+            try:
+                return await self._open()
+            except BaseException:
+                # Hand the turn to the next waiter, which tries to open one itself.
+                self._idle.put_nowait(None)
+                raise
+            finally:
+                self._opening -= 1
+
+    async def _discard(self, entry):
+        """Close a session that can't be reused, and let a waiting caller open a replacement."""
+        if entry in self._sessions:
+            self._sessions.remove(entry)
+        entry.stop.set()
+        try:
+            await asyncio.wait_for(entry.task, timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            entry.task.cancel()
+        if not self._closed:
+            self._idle.put_nowait(None)
+
+    async def _with_session(self, operation, timeout):
+        """Run *operation* on an idle session, giving up after *timeout* seconds.
+
+        The timeout covers waiting for (or opening) a session as well as the
+        call itself.
+        """
+        if self._closed:
+            raise RuntimeError("The Work IQ session pool is closed")
+        try:
+            return await asyncio.wait_for(self._run_on_session(operation), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No reply from Work IQ within {timeout}s") from None
+
+    async def _run_on_session(self, operation, retry=True):
+        """Run *operation* on an idle session, returning the session to the pool after."""
+        entry = await self._acquire()
+        try:
+            result = await operation(entry.session)
+        except asyncio.CancelledError:
+            # Cancelled or timed out mid-call: a late reply could still arrive on
+            # this session, so don't reuse it. Discard it in the background so
+            # the cancellation isn't held up.
+            asyncio.create_task(self._discard(entry))
+            raise
+        except Exception as ex:
+            if not _connection_lost(ex):
+                self._idle.put_nowait(entry)
+                raise
+            await self._discard(entry)
+            if not retry:
+                raise
+            return await self._run_on_session(operation, retry=False)
+        except BaseException:
+            self._idle.put_nowait(entry)
+            raise
+        self._idle.put_nowait(entry)
+        return result
+
+    async def _close_all(self):
+        for entry in list(self._sessions):
+            await self._discard(entry)
+
+
+def load_cached_tools(path, version):
+    """Return the tools saved for this Work IQ version, or None if there aren't any."""
+    if not version:
+        return None
+    try:
+        cached = json.loads(Path(path).read_text(encoding="utf-8"))
+        if cached.get("version") != version:
+            return None
+        return [Tool.model_validate(tool) for tool in cached["tools"]]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cached_tools(path, version, tools):
+    """Save the tool list (names, descriptions and input schemas) for this Work IQ version."""
+    if not version:
+        return
+    cached = {"version": version, "tools": tools_as_json(tools)}
+    Path(path).write_text(json.dumps(cached, indent=2) + "\n", encoding="utf-8")
+
+
+def tools_as_json(tools):
+    return [tool.model_dump(mode="json", exclude_none=True) for tool in tools]
@@ -0,0 +1,198 @@
+"""
+Caldova – answer cache for repeated questions (provided).
+
+You don't need to edit this file. Staff ask the same few questions again and
+again - review windows, CMO tiers, supplier lead times - and each one costs a
+full agent response. This cache remembers answers and reuses them for the same
+question, or a close rewording of it:
+
+- Questions are normalized (lowercased, stemmed, stop words dropped), so "What's
+  the review window for capacity requests?" and "what is the review window for a
+  capacity request" are the same question. Negations ("not", "no", "never",
+  "can't") are kept, so "Which sites can't make sterile product?" never gets the
+  answer to "Which sites can make sterile product?".
+- Near-duplicates are found with MinHash: each question gets a short signature,
+  and questions whose signatures share a band are compared word by word. A
+  cached answer is reused when the two questions overlap by at least
+  SIMILARITY_THRESHOLD.
+- Answers expire after `ttl` seconds, and every answer is dropped as soon as any
+  knowledge document in data/ changes. Documents are only rehashed when a file's
+  modification time or size changes, so a lookup stays cheap.
+- `report()` gives the hit rate and the agent time the hits saved.
+"""
+
+import hashlib
+import random
+import re
+import time
+from collections import OrderedDict
+
+from local_search import DATA_DIR, source_hashes, tokenize
+
+# Share of words (and word pairs) two questions must have in common to count
+# as the same question.
+SIMILARITY_THRESHOLD = 0.75
+
+# Questions shorter than this (after dropping stop words) are usually follow-ups
+# like "and Brightwater?" that only make sense in context, so they aren't cached.
+MIN_QUESTION_TERMS = 3
+
+# MinHash signature size, split into BANDS bands of ROWS values each. Questions
+# that match on any whole band become candidates.
+BANDS = 8
+ROWS = 4
+
+# Words that flip a question's meaning. They're all normalized to "not", and two
+# questions only match if both are negated or neither is.
+NEGATIONS = {"not", "no", "never", "nor", "cannot"}
+
+# Contractions rewritten before tokenizing, since "can't" would otherwise
+# become the stop word "can" plus a dropped "t".
+_CONTRACTIONS = [
+    (re.compile(r"\bcan['’]t\b"), "can not"),
+    (re.compile(r"\bwon['’]t\b"), "will not"),
+    (re.compile(r"n['’]t\b"), " not"),
+]
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def question_terms(question):
+    """The question's normalized words, with every negation as "not"."""
+    text = question.lower()
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return ["not" if term in NEGATIONS else term for term in tokenize(text) if len(term) > 1]
+
+
+def shingles(question):
+    """The question's normalized words plus adjacent word pairs."""
+    terms = question_terms(question)
+    return set(terms) | {f"{a} {b}" for a, b in zip(terms, terms[1:])}
+
+
+def docs_signature():
+    """Modification time and size of every knowledge document - cheap to read on every lookup."""
+    return {
+        path.name: (stat.st_mtime_ns, stat.st_size)
+        for path in sorted(DATA_DIR.glob("*.md"))
+        for stat in [path.stat()]
+    }
+
+
+def minhash(items):
+    """MinHash signature of a set of strings."""
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big") for item in items]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def bands(signature):
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+class AnswerCache:
+    """Reuses agent answers for repeated and near-duplicate questions."""
+
+    def __init__(self, ttl=3600, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # normalized key -> entry dict, least recently used first
+        self.buckets = {}             # (band, band values) -> set of keys
+        self.docs_signature = docs_signature()
+        self.docs_version = source_hashes()
+        self.hits = self.misses = 0
+        self.seconds_saved = 0.0
+
+    def get(self, question):
+        """Return a cached answer for the question (or a close rewording), or None."""
+        self._check_docs()
+        terms = shingles(question)
+        if len(question_terms(question)) < MIN_QUESTION_TERMS:
+            self.misses += 1
+            return None
+
+        key = " ".join(sorted(terms))
+        entry = self.entries.get(key) or self._nearest(terms)
+        if entry is not None and time.monotonic() - entry["created"] > self.ttl:
+            self._remove(entry["key"])
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(entry["key"])
+        self.hits += 1
+        self.seconds_saved += entry["seconds"]
+        return entry["answer"]
+
+    def put(self, question, answer, seconds):
+        """Cache an answer that took the agent *seconds* to produce."""
+        terms = shingles(question)
+        if len(question_terms(question)) < MIN_QUESTION_TERMS or not answer:
+            return
+        key = " ".join(sorted(terms))
+        if key in self.entries:
+            self._remove(key)
+
+        signature = minhash(terms)
+        self.entries[key] = {
+            "key": key,
+            "terms": terms,
+            "signature": signature,
+            "answer": answer,
+            "seconds": seconds,
+            "created": time.monotonic(),
+        }
+        for band in bands(signature):
+            self.buckets.setdefault(band, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.buckets.clear()
+
+    def report(self):
+        asked = self.hits + self.misses
+        rate = self.hits / asked if asked else 0.0
+        return (f"Answer cache: {self.hits}/{asked} questions answered from cache ({rate:.0%}), "
+                f"about {self.seconds_saved:.1f}s of agent time saved")
+
+    def _nearest(self, terms):
+        """Return the most similar cached entry above the threshold, if any."""
+        candidates = set()
+        for band in bands(minhash(terms)):
+            candidates |= self.buckets.get(band, set())
+
+        best, best_score = None, SIMILARITY_THRESHOLD
+        for key in candidates:
+            entry = self.entries[key]
+            if ("not" in terms) != ("not" in entry["terms"]):
+                continue  # one question is negated and the other isn't
+            score = len(terms & entry["terms"]) / len(terms | entry["terms"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        for band in bands(entry["signature"]):
+            bucket = self.buckets.get(band)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band]
+
+    def _check_docs(self):
+        """Drop every answer if a knowledge document has changed since it was cached."""
+        signature = docs_signature()
+        if signature == self.docs_signature:
+            return
+        # A file was touched or replaced: rehash to see whether its content changed
+        self.docs_signature = signature
+        current = source_hashes()
+        if current != self.docs_version:
+            self.docs_version = current
+            self.clear()
@@ -0,0 +1,117 @@
+"""
+Caldova – local vs. remote retrieval latency.
+
+Times the same questions against two retrievers over the Caldova knowledge base:
+
+    local    local_search.py: a BM25 keyword index over data/, in this process
+    remote   the 'ks-caldovaproducts' vector store in your Foundry project,
+             searched over the network with vector_stores.search
+
+The remote side needs the vector store that setup/bootstrap_agent.py creates,
+PROJECT_ENDPOINT in .env, and 'az login'. Use --local-only to time just the
+local index (no Azure resources needed):
+
+    python benchmark_retrieval.py
+    python benchmark_retrieval.py --runs 10
+    python benchmark_retrieval.py --local-only
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import local_search
+
+VECTOR_STORE_NAME = "ks-caldovaproducts"
+
+QUESTIONS = [
+    "What is the review window for a capacity request?",
+    "Which contract manufacturers offer the premium transfer tier?",
+    "What are the core hours at the planning desk?",
+    "How long is the lead time for sterile vials?",
+    "What happens in the engineering runs stage of a tech transfer?",
+    "How much free capacity does the Brightwater plant have?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label, timings):
+    ms = [seconds * 1000 for seconds in timings]
+    print(f"{label:<22}{statistics.median(ms):>10.2f}{percentile(ms, 95):>10.2f}{max(ms):>10.2f}")
+
+
+def time_local(runs):
+    """Time one cold index load, then every question *runs* times."""
+    start = time.perf_counter()
+    local_search.load_index()
+    cold = time.perf_counter() - start
+
+    local_search.search(QUESTIONS[0])  # loads the index into memory
+    timings = []
+    for _ in range(runs):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            local_search.search(question)
+            timings.append(time.perf_counter() - start)
+    return cold, timings
+
+
+def time_remote(runs):
+    """Time every question *runs* times against the project's vector store."""
+    from dotenv import load_dotenv
+    from azure.identity import DefaultAzureCredential
+    from azure.ai.projects import AIProjectClient
+
+    load_dotenv()
+    project_endpoint = os.getenv("PROJECT_ENDPOINT")
+    if not project_endpoint:
+        raise SystemExit("PROJECT_ENDPOINT must be set in .env (or use --local-only)")
+
+    with (
+        DefaultAzureCredential(
+            exclude_environment_credential=True,
+            exclude_managed_identity_credential=True
+        ) as credential,
+        AIProjectClient(endpoint=project_endpoint, credential=credential) as project_client,
+        project_client.get_openai_client() as openai_client,
+    ):
+        store = next((s for s in openai_client.vector_stores.list() if s.name == VECTOR_STORE_NAME), None)
+        if store is None:
+            raise SystemExit(f"No vector store named '{VECTOR_STORE_NAME}'. Run setup/bootstrap_agent.py first.")
+
+        # The first call also opens the connection and fetches a token; keep it
+        # out of the timings, as a long-running client would.
+        openai_client.vector_stores.search(vector_store_id=store.id, query=QUESTIONS[0])
+        timings = []
+        for _ in range(runs):
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                openai_client.vector_stores.search(vector_store_id=store.id, query=question, max_num_results=3)
+                timings.append(time.perf_counter() - start)
+        return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local and remote retrieval latency.")
+    parser.add_argument("--runs", type=int, default=5, help="times to ask each question (default 5)")
+    parser.add_argument("--local-only", action="store_true", help="skip the remote vector store")
+    args = parser.parse_args()
+
+    print(f"{len(QUESTIONS)} questions x {args.runs} runs\n")
+    print(f"{'retriever':<22}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+
+    cold, local = time_local(args.runs)
+    report("local (BM25)", local)
+    if not args.local_only:
+        report("remote (vector store)", time_remote(args.runs))
+
+    print(f"\nLoading the local index from disk took {cold * 1000:.1f} ms (once per process).")
+
+
+if __name__ == "__main__":
+    main()
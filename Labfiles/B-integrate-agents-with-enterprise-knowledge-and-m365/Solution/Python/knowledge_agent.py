@@ -1,8 +1,14 @@
+import json
 import os
+import tempfile
+from collections import deque
 from dotenv import load_dotenv
 from azure.identity import DefaultAzureCredential
 from azure.ai.projects import AIProjectClient
 
+from local_search import search_knowledge_base
+from mcp_approvals import ApprovalEngine
+
 # Load environment variables
 load_dotenv()
 project_endpoint = os.getenv("PROJECT_ENDPOINT")
@@ -15,6 +21,32 @@ if not project_endpoint or not agent_name:
 print(f"Connecting to project: {project_endpoint}")
 print(f"Using agent: {agent_name}\n")
 
+
+def ask_for_approval(approval_request):
+    """
+    Show an MCP approval request and ask the user whether to allow it.
+    """
+    print(f"[Approval required for: {approval_request.name}]\n")
+    print(f"Server: {approval_request.server_label}")
+
+    # Parse and display the arguments (optional, for transparency)
+    try:
+        args = json.loads(approval_request.arguments)
+        print(f"Arguments: {json.dumps(args, indent=2)}\n")
+    except Exception:
+        print(f"Arguments: {approval_request.arguments}\n")
+
+    # Prompt user for approval. A yes also covers later calls to the same tool.
+    approval_input = input("Approve this action for the rest of this session? (yes/no): ").strip().lower()
+
+    if approval_input in ['yes', 'y']:
+        print("Approving action...\n")
+        return True
+
+    print("Action denied.\n")
+    return False
+
+
 # Connect to the project and agent
 credential = DefaultAzureCredential(
     exclude_environment_credential=True,
@@ -36,9 +68,59 @@ print(f"Connected to agent: {agent.name} (id: {agent.id})\n")
 conversation = openai_client.conversations.create(items=[])
 print(f"Created conversation (id: {conversation.id})\n")
 
+# Answer the agent's MCP approval requests by asking the user, and run the
+# local search tool if the agent calls it
+approvals = ApprovalEngine(
+    openai_client, conversation.id, agent.name,
+    decide=ask_for_approval,
+    tools={"search_knowledge_base": search_knowledge_base},
+)
+
+
+class ConversationHistory:
+    """
+    Client-side conversation history with a fixed memory footprint.
+
+    The most recent turns are kept in memory. Older turns are appended to a
+    temporary JSONL file as they fall out, so a session left running all day
+    (a kiosk, say) doesn't grow without bound. close() deletes the file.
+    """
+
+    def __init__(self, max_in_memory=20):
+        handle, self.path = tempfile.mkstemp(prefix="conversation_history_", suffix=".jsonl")
+        os.close(handle)
+        self.max_in_memory = max_in_memory
+        self.recent = deque()
+        self.spilled = 0
+
+    def append(self, turn):
+        self.recent.append(turn)
+        if len(self.recent) > self.max_in_memory:
+            with open(self.path, "a", encoding="utf-8") as history_file:
+                history_file.write(json.dumps(self.recent.popleft()) + "\n")
+            self.spilled += 1
+
+    def __len__(self):
+        return self.spilled + len(self.recent)
+
+    def __iter__(self):
+        """Yield every turn, oldest first, reading spilled turns one at a time."""
+        if self.spilled:
+            with open(self.path, encoding="utf-8") as history_file:
+                for line in history_file:
+                    yield json.loads(line)
+        yield from list(self.recent)
+
+    def close(self):
+        """Delete the file of older turns."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
 
 # Conversation history for context (client-side tracking)
-conversation_history = []
+conversation_history = ConversationHistory()
 
 
 def send_message_to_agent(user_message):
@@ -67,61 +149,10 @@ def send_message_to_agent(user_message):
             input=""
         )
 
-        # Check if the response output contains an MCP approval request
-        approval_request = None
-        if hasattr(response, 'output') and response.output:
-            for item in response.output:
-                if hasattr(item, 'type') and item.type == 'mcp_approval_request':
-                    approval_request = item
-                    break
-
-        # Handle approval request if present
-        if approval_request:
-            print(f"[Approval required for: {approval_request.name}]\n")
-            print(f"Server: {approval_request.server_label}")
-
-            # Parse and display the arguments (optional, for transparency)
-            import json
-            try:
-                args = json.loads(approval_request.arguments)
-                print(f"Arguments: {json.dumps(args, indent=2)}\n")
-            except Exception:
-                print(f"Arguments: {approval_request.arguments}\n")
-
-            # Prompt user for approval
-            approval_input = input("Approve this action? (yes/no): ").strip().lower()
-
-            if approval_input in ['yes', 'y']:
-                print("Approving action...\n")
-
-                # Create approval response item
-                approval_response = {
-                    "type": "mcp_approval_response",
-                    "approval_request_id": approval_request.id,
-                    "approve": True
-                }
-            else:
-                print("Action denied.\n")
-
-                # Create denial response item
-                approval_response = {
-                    "type": "mcp_approval_response",
-                    "approval_request_id": approval_request.id,
-                    "approve": False
-                }
-
-            # Add the approval response to the conversation
-            openai_client.conversations.items.create(
-                conversation_id=conversation.id,
-                items=[approval_response]
-            )
-
-            # Get the actual response after approval/denial
-            response = openai_client.responses.create(
-                conversation=conversation.id,
-                extra_body={"agent_reference": {"name": agent.name, "type": "agent_reference"}},
-                input=""
-            )
+        # Answer every approval request and local search call the agent makes. Pending
+        # requests are answered together, and a tool you've already approved isn't
+        # asked about again.
+        response = approvals.resolve(response)
 
         # Extract the response text
         if response and response.output_text:
@@ -150,19 +181,24 @@ def send_message_to_agent(user_message):
         return None
 
 
-def display_conversation_history():
+def display_conversation_history(page_size=10):
     """
-    Display the full conversation history.
+    Display the full conversation history, a page at a time.
     """
     print("\n" + "=" * 60)
-    print("CONVERSATION HISTORY")
+    print(f"CONVERSATION HISTORY ({len(conversation_history)} turns)")
     print("=" * 60 + "\n")
 
-    for turn in conversation_history:
+    for number, turn in enumerate(conversation_history, start=1):
         role = turn["role"].upper()
         content = turn["content"]
         print(f"{role}: {content}\n")
 
+        if number % page_size == 0 and number < len(conversation_history):
+            more = input("-- Press Enter for more, or q to stop -- ").strip().lower()
+            if more == "q":
+                break
+
     print("=" * 60 + "\n")
 
 
@@ -174,29 +210,32 @@ def main():
     print("Ask questions about plant capacity, contract manufacturers, tech transfer, and suppliers.")
     print("Type 'history' to see conversation history, or 'quit' to exit.\n")
 
-    while True:
-        try:
-            user_input = input("You: ").strip()
+    try:
+        while True:
+            try:
+                user_input = input("You: ").strip()
 
-            if not user_input:
-                continue
+                if not user_input:
+                    continue
 
-            if user_input.lower() == 'quit':
-                print("\nEnding conversation...")
-                break
+                if user_input.lower() == 'quit':
+                    print("\nEnding conversation...")
+                    break
 
-            if user_input.lower() == 'history':
-                display_conversation_history()
-                continue
+                if user_input.lower() == 'history':
+                    display_conversation_history()
+                    continue
 
-            # Send message and get response
-            send_message_to_agent(user_input)
+                # Send message and get response
+                send_message_to_agent(user_input)
 
-        except KeyboardInterrupt:
-            print("\n\nInterrupted by user.")
-            break
-        except Exception as e:
-            print(f"\nUnexpected error: {str(e)}\n")
+            except KeyboardInterrupt:
+                print("\n\nInterrupted by user.")
+                break
+            except Exception as e:
+                print(f"\nUnexpected error: {str(e)}\n")
+    finally:
+        conversation_history.close()
 
     print("\nConversation ended.")
 
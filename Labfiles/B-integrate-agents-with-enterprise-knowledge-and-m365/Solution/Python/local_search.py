@@ -0,0 +1,203 @@
+"""
+Caldova – local knowledge search (provided).
+
+You don't need to edit this file. The Caldova knowledge base is only six
+markdown files, so a search over them doesn't need a round trip to a remote
+search service. This module builds a small BM25 keyword index over the docs in
+`data/` and exposes it as `search_knowledge_base`, a function tool the
+knowledge agent can call before (or instead of) its remote knowledge tool.
+
+- Each document is split into sections at its headings, so a result is a
+  focused passage rather than a whole file.
+- The index is saved to `local_search_index.json` next to this file and reused
+  on the next run. It is rebuilt automatically when any document changes.
+
+Try it on its own:
+
+    python local_search.py "What is the review window for a capacity request?"
+"""
+
+import hashlib
+import json
+import math
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+INDEX_PATH = Path(__file__).resolve().parent / "local_search_index.json"
+INDEX_VERSION = 1  # bump when tokenizing or chunking changes, so saved indexes are rebuilt
+
+# Standard BM25 tuning: k1 damps repeated terms, b normalizes for section length.
+K1 = 1.2
+B = 0.75
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "of", "on", "or", "our", "should", "that", "the", "their",
+    "this", "to", "we", "what", "when", "which", "who", "will", "with", "you", "your",
+}
+
+# The function tool definition, for agents that should call search_knowledge_base.
+TOOL_DEFINITION = {
+    "name": "search_knowledge_base",
+    "description": "Search the Caldova knowledge base (capacity booking policy, CMO directory, "
+                   "plant capacity, site operations, supplier guide, tech transfer playbook) "
+                   "and return the most relevant sections.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "what to search for, in a few keywords or a short question",
+            },
+        },
+        "required": ["query"],
+        "additionalProperties": False,
+    },
+}
+
+
+def stem(word):
+    """Strip a common English suffix, so 'reviewed' and 'reviews' match 'review'."""
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """Lowercase, stemmed word tokens, without common stop words."""
+    return [stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOP_WORDS]
+
+
+def is_banner(line):
+    """True for the ===== rule the docs draw above and below a section title."""
+    line = line.strip()
+    return len(line) >= 5 and set(line) == {"="}
+
+
+def split_sections(path):
+    """Split a document into (section heading, section text) pairs.
+
+    A section starts at a markdown heading, or at a title set between two =====
+    rules, which is how several of the Caldova docs mark their sections.
+    """
+    sections = []
+    heading, body = path.stem, []
+    lines = path.read_text(encoding="utf-8").splitlines()
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if line.startswith("#"):
+            title = line.lstrip("#").strip()
+        elif is_banner(line) and index < len(lines):
+            title = lines[index].strip()
+            index += 2 if index + 1 < len(lines) and is_banner(lines[index + 1]) else 1
+        else:
+            body.append(line)
+            continue
+        if any(text.strip() for text in body):
+            sections.append((heading, "\n".join(body).strip()))
+        heading, body = title, []
+    if any(text.strip() for text in body):
+        sections.append((heading, "\n".join(body).strip()))
+    return sections
+
+
+def source_hashes():
+    """Content hash of every knowledge document, to tell when the index is stale."""
+    return {
+        path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in sorted(DATA_DIR.glob("*.md"))
+    }
+
+
+def build_index(hashes):
+    """Build the BM25 index over every section of every document."""
+    chunks, lengths, postings = [], [], {}
+    for name in hashes:
+        for heading, text in split_sections(DATA_DIR / name):
+            chunk_id = len(chunks)
+            terms = tokenize(f"{heading} {text}")
+            chunks.append([name, heading, text])
+            lengths.append(len(terms))
+            # Postings are stored flat - [chunk, count, chunk, count, ...] - to
+            # keep the saved file small.
+            for term, count in Counter(terms).items():
+                postings.setdefault(term, []).extend([chunk_id, count])
+    return {
+        "version": INDEX_VERSION,
+        "sources": hashes,
+        "chunks": chunks,
+        "lengths": lengths,
+        "postings": postings,
+    }
+
+
+def load_index():
+    """Load the saved index, rebuilding and saving it if a document has changed."""
+    hashes = source_hashes()
+    try:
+        index = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+        if index.get("version") == INDEX_VERSION and index.get("sources") == hashes:
+            return index
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(hashes)
+    INDEX_PATH.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    return index
+
+
+_index = None
+
+
+def search(query, top=3):
+    """Return the *top* best-matching sections as dicts, best first."""
+    global _index
+    if _index is None:
+        _index = load_index()
+
+    chunks, lengths, postings = _index["chunks"], _index["lengths"], _index["postings"]
+    if not chunks:
+        return []
+    average_length = sum(lengths) / len(lengths)
+
+    scores = Counter()
+    for term in set(tokenize(query)):
+        posting = postings.get(term)
+        if not posting:
+            continue
+        frequency = len(posting) // 2
+        idf = math.log(1 + (len(chunks) - frequency + 0.5) / (frequency + 0.5))
+        for chunk_id, count in zip(posting[::2], posting[1::2]):
+            norm = K1 * (1 - B + B * lengths[chunk_id] / average_length)
+            scores[chunk_id] += idf * count * (K1 + 1) / (count + norm)
+
+    return [
+        {
+            "document": chunks[chunk_id][0],
+            "section": chunks[chunk_id][1],
+            "text": chunks[chunk_id][2],
+            "score": round(score, 3),
+        }
+        for chunk_id, score in scores.most_common(top)
+    ]
+
+
+def search_knowledge_base(query):
+    """Function tool: search the local knowledge base and return JSON results."""
+    results = search(query)
+    if not results:
+        return json.dumps({"results": [], "note": "No matching sections in the local knowledge base."})
+    return json.dumps({"results": results})
+
+
+if __name__ == "__main__":
+    question = " ".join(sys.argv[1:]) or "What is the review window for a capacity request?"
+    for result in search(question):
+        print(f"[{result['score']}] {result['document']} > {result['section']}")
+        print(f"    {result['text'][:200]}...\n")
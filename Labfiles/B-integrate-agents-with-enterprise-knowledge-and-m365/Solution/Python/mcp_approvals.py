@@ -0,0 +1,102 @@
+"""
+Caldova – MCP approval engine (provided).
+
+You don't need to edit this file. When an agent's MCP tool (such as the Foundry
+IQ knowledge tool) requires approval, the response comes back with one or more
+`mcp_approval_request` items instead of an answer. This engine answers them:
+
+- Every pending request in the response is collected and answered together, in
+  a single `responses.create` call that also asks for the agent's next response,
+  rather than one at a time.
+- If the agent asks again after that (for a follow-up lookup, say), the engine
+  keeps going until the response carries no more requests.
+- If the agent calls a local function tool (such as `search_knowledge_base`
+  from local_search.py), the engine runs the matching function from `tools`
+  and sends its output back in the same batch as any approvals.
+- Once a tool on a server has been approved, later requests for the same
+  server and tool are approved automatically for the rest of the session, so
+  the user is only asked once.
+
+Each client decides how a new request is approved by passing a `decide`
+function: the console client asks the user, the web chat approves everything.
+"""
+
+import json
+from typing import Callable
+
+# A runaway approval loop should fail loudly rather than spin forever.
+MAX_APPROVAL_ROUNDS = 10
+
+
+class ApprovalEngine:
+    """Answers MCP approval requests for one conversation with one agent."""
+
+    def __init__(self, openai_client, conversation_id: str, agent_name: str, decide: Callable, tools=None):
+        self.openai_client = openai_client
+        self.conversation_id = conversation_id
+        self.agent_name = agent_name
+        self.decide = decide
+        self.tools = tools or {}  # function tool name -> Python function that runs it
+        self.approved_policies = set()  # (server_label, tool name) pairs approved this session
+
+    def create_response(self, input=""):
+        """Ask the agent to respond to the conversation so far, plus any new input items."""
+        return self.openai_client.responses.create(
+            conversation=self.conversation_id,
+            extra_body={"agent_reference": {"name": self.agent_name, "type": "agent_reference"}},
+            input=input
+        )
+
+    def resolve(self, response):
+        """Answer approval requests and function calls until the agent returns a response without any."""
+        for _ in range(MAX_APPROVAL_ROUNDS):
+            requests = pending_approval_requests(response)
+            calls = pending_function_calls(response)
+            if not requests and not calls:
+                return response
+
+            answers = [self.call_function(call) for call in calls]
+            for request in requests:
+                policy = (request.server_label, request.name)
+                approve = policy in self.approved_policies or bool(self.decide(request))
+                if approve:
+                    self.approved_policies.add(policy)
+                answers.append({
+                    "type": "mcp_approval_response",
+                    "approval_request_id": request.id,
+                    "approve": approve,
+                })
+
+            # One call answers every request and asks for the next response.
+            response = self.create_response(input=answers)
+
+        raise RuntimeError(f"Agent still requested approvals or tool output after {MAX_APPROVAL_ROUNDS} rounds")
+
+    def call_function(self, call):
+        """Run a function tool the agent called and return its output item."""
+        function = self.tools.get(call.name)
+        if function is None:
+            output = json.dumps({"error": f"Unknown function '{call.name}'"})
+        else:
+            try:
+                output = function(**json.loads(call.arguments or "{}"))
+            except Exception as ex:
+                # Report the failure to the agent so it can answer another way.
+                output = json.dumps({"error": str(ex)})
+        return {"type": "function_call_output", "call_id": call.call_id, "output": output}
+
+
+def pending_approval_requests(response):
+    """Return every `mcp_approval_request` item in a response's output."""
+    return [
+        item for item in (getattr(response, "output", None) or [])
+        if getattr(item, "type", None) == "mcp_approval_request"
+    ]
+
+
+def pending_function_calls(response):
+    """Return every `function_call` item in a response's output."""
+    return [
+        item for item in (getattr(response, "output", None) or [])
+        if getattr(item, "type", None) == "function_call"
+    ]
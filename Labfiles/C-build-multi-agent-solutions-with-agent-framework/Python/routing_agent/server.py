@@ -1,9 +1,11 @@
 import os
+import json
 import asyncio
 from fastapi import FastAPI, Request
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from routing_agent.agent import RoutingAgent  
+from sse_starlette.sse import EventSourceResponse
+from routing_agent.agent import DEFAULT_SESSION_ID, SEND_MESSAGE_TIMEOUT, RoutingAgent, describe_task_update
 
 load_dotenv()
 
@@ -13,13 +15,20 @@ routing_agent = None
 async def lifespan(app: FastAPI):
     global routing_agent
     print("Starting up: Initializing routing agent...")
+    # Extra servers (replicas) for the remote agents can be listed in REMOTE_AGENT_REPLICAS;
+    # addresses whose cards share a name are load-balanced as one agent
+    replicas = [address.strip() for address in os.environ.get("REMOTE_AGENT_REPLICAS", "").split(",") if address.strip()]
+    # How long to wait for a remote agent's answer, in seconds
+    send_message_timeout = float(os.environ.get("SEND_MESSAGE_TIMEOUT") or SEND_MESSAGE_TIMEOUT)
     routing_agent = await RoutingAgent.create([
         f"http://{os.environ["SERVER_URL"]}:{os.environ["TITLE_AGENT_PORT"]}",
         f"http://{os.environ["SERVER_URL"]}:{os.environ["OUTLINE_AGENT_PORT"]}",
-    ])
-    routing_agent.create_agent()
+        *replicas,
+    ], hedging=os.environ.get("HEDGE_REMOTE_REQUESTS", "").lower() == "true", send_message_timeout=send_message_timeout)
+    await routing_agent.create_agent()
     print("Routing agent initialized.")
     yield
+    await routing_agent.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -30,16 +39,65 @@ async def handle_message(request: Request):
     data = await request.json()
     user_message = data.get("message")
 
+    # Messages with the same session_id continue one conversation; without one, they share the default conversation
+    session_id = data.get("session_id") or DEFAULT_SESSION_ID
+
     if not user_message:
         return {"error": "No message provided."}
     
     try:
-        response = await routing_agent.process_user_message(user_message)
+        response = await routing_agent.process_user_message(user_message, session_id=session_id)
 
     except Exception as e:
         return {"error": f"Failed to process message: {str(e)}"}
     
-    return {"response": response}
+    return {"response": response, "session_id": session_id}
+
+@app.post("/message/stream")
+async def handle_message_stream(request: Request):
+    # Like /message, but streams the remote agents' progress as Server-Sent Events
+    # while they work, then sends the routing agent's answer as a final 'response' event
+    data = await request.json()
+    user_message = data.get("message")
+    session_id = data.get("session_id") or DEFAULT_SESSION_ID
+
+    async def events():
+        if not user_message:
+            yield {"event": "error", "data": json.dumps({"error": "No message provided."})}
+            return
+
+        updates = asyncio.Queue()
+
+        def on_task_update(event, card):
+            updates.put_nowait(describe_task_update(event, card))
+
+        work = asyncio.create_task(routing_agent.process_user_message(
+            user_message, session_id=session_id, task_listener=on_task_update
+        ))
+        work.add_done_callback(lambda _: updates.put_nowait(None))
+        try:
+            while (update := await updates.get()) is not None:
+                yield {"event": update["type"], "data": json.dumps(update)}
+
+            yield {"event": "response", "data": json.dumps({"response": work.result(), "session_id": session_id})}
+        except Exception as e:
+            yield {"event": "error", "data": json.dumps({"error": f"Failed to process message: {str(e)}"})}
+        finally:
+            # Stop working on the request if the caller disconnects
+            work.cancel()
+
+    return EventSourceResponse(events())
+
+@app.get("/stats")
+async def stats():
+    return {
+        "http": routing_agent.http_stats.as_dict(),
+        "sessions": routing_agent.session_stats(),
+        "local_routing": routing_agent.router_stats.as_dict(),
+        "tool_outputs": routing_agent.tool_output_stats.as_dict(),
+        "replicas": routing_agent.replica_stats(),
+        "hedging": routing_agent.hedge_stats(),
+    }
 
 @app.get("/health")
 async def health_check():
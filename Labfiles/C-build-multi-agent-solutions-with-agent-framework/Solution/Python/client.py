@@ -1,7 +1,10 @@
 """ Client code that connects to the routing agent """
 
 import os
+import json
+import uuid
 import asyncio
+import argparse
 import requests
 from dotenv import load_dotenv
 
@@ -10,9 +13,10 @@ load_dotenv()
 server = os.environ["SERVER_URL"]
 port = os.environ["ROUTING_AGENT_PORT"]
 
-def send_prompt(prompt: str):
+def send_prompt(prompt: str, session_id: str | None = None):
+    # Wait for the whole response, without progress updates (used with --no-stream)
     url = f"http://{server}:{port}/message"
-    payload = {"message": prompt}
+    payload = {"message": prompt, "session_id": session_id}
     try:
         response = requests.post(url, json=payload)
         if response.status_code == 200:
@@ -22,14 +26,47 @@ def send_prompt(prompt: str):
     except Exception as e:
         return f"Request failed: {e}"
 
+def stream_prompt(prompt: str, session_id: str | None = None):
+    # Print the remote agents' progress as it streams in, then return the final response
+    url = f"http://{server}:{port}/message/stream"
+    payload = {"message": prompt, "session_id": session_id}
+    try:
+        with requests.post(url, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                return f"Error {response.status_code}: {response.text}"
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "response":
+                        return data.get("response", "No response from agent.")
+                    if event == "error":
+                        return data["error"]
+                    if data.get("text"):
+                        print(f"  ({data['agent']}) {data['text']}")
+    except Exception as e:
+        return f"Request failed: {e}"
+    return "No response from agent."
+
 async def main():
+    parser = argparse.ArgumentParser(description="Chat with the routing agent.")
+    parser.add_argument("--no-stream", action="store_true",
+                        help="Wait for each full response instead of streaming the remote agents' progress.")
+    args = parser.parse_args()
+    ask = send_prompt if args.no_stream else stream_prompt
+
     print("Enter a prompt for the Caldova transfer planner. Type 'quit' to exit.")
+
+    # Every prompt in this chat continues the same conversation with the routing agent
+    session_id = str(uuid.uuid4())
     while True:
         user_input = input("User: ")
         if user_input.lower() == "quit":
             print("Goodbye!")
             break
-        response = send_prompt(user_input)
+        response = ask(user_input, session_id)
         print(f"Agent: {response}")
 
 if __name__ == "__main__":
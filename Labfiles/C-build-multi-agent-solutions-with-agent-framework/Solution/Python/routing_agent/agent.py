@@ -1,74 +1,496 @@
 import asyncio
 import json
 import os
+import random
 import time
 import uuid
 import httpx
 
+from collections import OrderedDict, deque
+
 from typing import Any, Callable
-from azure.ai.agents import AgentsClient
-from azure.identity import DefaultAzureCredential
+from azure.ai.agents.aio import AgentsClient
+from azure.identity.aio import DefaultAzureCredential
 from azure.ai.agents.models import ListSortOrder, FunctionTool, MessageRole
 from collections.abc import Callable
+from contextvars import ContextVar
 from dotenv import load_dotenv
 from a2a.client import A2ACardResolver, A2AClient
+from a2a.client.client_task_manager import ClientTaskManager
 from a2a.types import (
     AgentCard,
+    CancelTaskRequest,
+    Message,
     MessageSendParams,
+    Part,
     SendMessageRequest,
     SendMessageResponse,
     SendMessageSuccessResponse,
+    SendStreamingMessageRequest,
+    SendStreamingMessageSuccessResponse,
     Task,
     TaskArtifactUpdateEvent,
+    TaskIdParams,
+    TaskState,
     TaskStatusUpdateEvent,
 )
 
+from routing_agent.local_router import LocalRouter, RouterStats
+
 load_dotenv()
 
 TaskCallbackArg = Task | TaskStatusUpdateEvent | TaskArtifactUpdateEvent
 TaskUpdateCallback = Callable[[TaskCallbackArg, AgentCard], Task]
 
+# Extra task update callback for the request being processed (see process_user_message)
+_task_listener: ContextVar[TaskUpdateCallback | None] = ContextVar('task_listener', default=None)
+
+# How often to check on a run: start quickly so short runs and tool calls are
+# picked up at once, then back off so long runs don't flood the service.
+RUN_POLL_INITIAL = 0.2
+RUN_POLL_MAX = 2.0
+RUN_POLL_BACKOFF = 1.5
+
+# Default deadline for one delegated task, including any retry or hedged
+# request. server.py reads it from the SEND_MESSAGE_TIMEOUT environment variable.
+SEND_MESSAGE_TIMEOUT = 30
+
+# Hedging (off unless RoutingAgent is created with hedging=True): if a remote
+# agent hasn't answered within its recent p95 latency, the same message is
+# also sent to a second replica, and the first answer wins. The slower request
+# is cancelled. It needs HEDGE_MIN_SAMPLES answers to estimate the p95 from,
+# and never fires sooner than HEDGE_MIN_DELAY seconds.
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.5
+
+# Most characters of a remote agent's answer passed back to the routing model.
+TOOL_OUTPUT_MAX_CHARS = 4000
+
+# Connection pool for the HTTP client every remote agent shares. Idle
+# connections are kept alive so repeat requests skip the TCP (and TLS) setup;
+# HTTP/2 is used with agents served over https.
+HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30)
+
+# Most requests in flight to any one remote agent server at a time.
+MAX_CONNECTIONS_PER_AGENT = 10
+
+# Circuit breaker for remote agent servers: after BREAKER_FAILURES failed
+# requests or health checks in a row, a server gets no requests for
+# BREAKER_COOLDOWN seconds. After that, one request or health check decides
+# whether it's back.
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 30
+
+# How often every remote agent server's /health route is checked.
+HEALTH_CHECK_INTERVAL = 10
+HEALTH_CHECK_TIMEOUT = 2
+
+# Agent cards are fetched at startup and again every CARD_REFRESH_INTERVAL
+# seconds. A card that can't be refetched is kept for up to CARD_TTL seconds
+# before its agent is dropped.
+CARD_FETCH_TIMEOUT = 3
+CARD_REFRESH_INTERVAL = 60
+CARD_TTL = 300
+
+# Most conversations (each with its own thread) kept at once. Past this, the
+# least recently used idle conversation is dropped and its thread deleted.
+MAX_SESSIONS = 100
+
+# Messages sent without a session id share this one conversation. It isn't
+# counted in MAX_SESSIONS and is never dropped.
+DEFAULT_SESSION_ID = "default"
+
+
+class HttpClientStats:
+    """Counts requests and new connections on the shared HTTP client."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.http2_requests = 0
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections += 1
+        elif event == "http2.send_request_headers.started":
+            self.http2_requests += 1
+
+    def as_dict(self) -> dict[str, Any]:
+        reused = max(self.requests - self.connections, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections,
+            "reuse_rate": round(reused / self.requests, 2) if self.requests else 0.0,
+            "http2_requests": self.http2_requests,
+        }
+
+
+def create_http_client(stats: HttpClientStats) -> httpx.AsyncClient:
+    # One pooled client for every remote agent and card lookup
+    return httpx.AsyncClient(
+        http2=True,
+        limits=HTTP_LIMITS,
+        timeout=30,
+        event_hooks={"request": [stats.on_request]},
+    )
+
+
+def _text_of(parts: list[Part] | None) -> str:
+    return "\n".join(part.root.text for part in parts or [] if getattr(part.root, 'text', None))
+
+
+def describe_task_update(event: TaskCallbackArg, card: AgentCard) -> dict[str, Any]:
+    """A small JSON-ready summary of a remote agent's task update, for relaying to a caller."""
+    if isinstance(event, TaskArtifactUpdateEvent):
+        return {"type": "artifact", "agent": card.name, "name": event.artifact.name,
+                "text": _text_of(event.artifact.parts)}
+    status = event.status
+    return {"type": "status", "agent": card.name, "state": status.state.value,
+            "text": _text_of(status.message.parts) if status.message else ""}
+
+
+def task_text(task: Task) -> str:
+    """A finished task's answer: its artifacts' text, or else its final status message."""
+    texts = [_text_of(artifact.parts) for artifact in task.artifacts or []]
+    if not any(texts) and task.status.message:
+        texts = [_text_of(task.status.message.parts)]
+    return "\n".join(text for text in texts if text)
+
+
+def project_task(task: Task, max_chars: int = TOOL_OUTPUT_MAX_CHARS) -> dict[str, str]:
+    """Just the parts of a remote task the routing model needs: its final state and answer.
+
+    The full task also carries its history, every interim status message, and
+    metadata, all of which would become model input tokens.
+    """
+    answer = task_text(task)
+    if len(answer) > max_chars:
+        answer = answer[:max_chars] + " [truncated]"
+    return {"state": task.status.state.value, "answer": answer}
+
+
+class ToolOutputStats:
+    """Compares the size of the projected tool outputs with the full tasks they replace."""
+
+    def __init__(self):
+        self.outputs = 0
+        self.full_chars = 0
+        self.compact_chars = 0
+
+    def record(self, full: str, compact: str) -> None:
+        self.outputs += 1
+        self.full_chars += len(full)
+        self.compact_chars += len(compact)
+
+    def as_dict(self) -> dict[str, Any]:
+        # Roughly 4 characters per token for English text and JSON
+        full_tokens, compact_tokens = self.full_chars // 4, self.compact_chars // 4
+        return {
+            "tool_outputs": self.outputs,
+            "approx_full_tokens": full_tokens,
+            "approx_compact_tokens": compact_tokens,
+            "approx_tokens_saved_per_output": (full_tokens - compact_tokens) // self.outputs if self.outputs else 0,
+            "reduction": round(1 - compact_tokens / full_tokens, 2) if full_tokens else 0.0,
+        }
+
+
+def _connect_failed(error: BaseException) -> bool:
+    # True if the request never reached the server (the A2A client wraps the httpx error)
+    while error is not None:
+        if isinstance(error, httpx.ConnectError):
+            return True
+        error = error.__cause__
+    return False
+
+
+class Replica:
+    """One server (address) for a remote agent, with its current load and circuit breaker."""
+
+    def __init__(self, url: str, agent_client: A2AClient):
+        self.url = url
+        self.agent_client = agent_client
+        self.slots = asyncio.Semaphore(MAX_CONNECTIONS_PER_AGENT)
+        self.outstanding = 0      # requests in flight
+        self.failures = 0         # failures in a row
+        self.open_until = 0.0     # while the breaker is open, no requests until this time.monotonic()
+        self.trial = False        # a request is testing whether a tripped server is back
+
+    @property
+    def tripped(self) -> bool:
+        return self.failures >= BREAKER_FAILURES
+
+    def available(self, now: float) -> bool:
+        return not self.tripped or (now >= self.open_until and not self.trial)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial = False
+        if self.tripped:
+            self.open_until = time.monotonic() + BREAKER_COOLDOWN
+
+    def as_dict(self) -> dict[str, Any]:
+        if not self.tripped:
+            state = "closed"
+        else:
+            state = "open" if time.monotonic() < self.open_until else "half-open"
+        return {"url": self.url, "outstanding": self.outstanding, "failures": self.failures, "breaker": state}
+
 
 class RemoteAgentConnections:
-    """A class to hold the connections to the remote agents."""
+    """A class to hold the connections to the remote agents.
+
+    An agent can be served from several addresses (replicas). Each message goes to
+    the available replica with the fewest requests in flight.
+    """
 
-    def __init__(self, agent_card: AgentCard, agent_url: str):
-        self._httpx_client = httpx.AsyncClient(timeout=30)
-        self.agent_client = A2AClient(self._httpx_client, agent_card, url=agent_url)
+    def __init__(self, agent_card: AgentCard, agent_urls: list[str], httpx_client: httpx.AsyncClient,
+                 task_callback: TaskUpdateCallback | None = None, hedging: bool = False,
+                 send_message_timeout: float = SEND_MESSAGE_TIMEOUT):
+        self._httpx_client = httpx_client
+        self.task_callback = task_callback
+        self.replicas: dict[str, Replica] = {}
+        self.set_replicas(agent_card, agent_urls)
+
+        self.hedging = hedging
+        self.latencies: deque[float] = deque(maxlen=200)  # seconds, recent successful requests
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.send_message_timeout = send_message_timeout
+        self._cancellations: set[asyncio.Task] = set()  # requests being cancelled in the background
+
+    def set_replicas(self, agent_card: AgentCard, agent_urls: list[str]) -> None:
+        # Update the card and addresses, keeping the load and health of replicas that are still listed
         self.card = agent_card
+        self.replicas = {
+            url: self.replicas.get(url) or Replica(url, A2AClient(self._httpx_client, agent_card, url=url))
+            for url in agent_urls
+        }
 
     def get_agent(self) -> AgentCard:
         return self.card
 
+    def _pick_replica(self, tried: list[Replica] = ()) -> Replica:
+        # Least outstanding requests among the replicas whose breaker lets requests through
+        now = time.monotonic()
+        candidates = [replica for replica in self.replicas.values() if replica.available(now) and replica not in tried]
+        if not candidates:
+            raise RuntimeError(f'No healthy server for {self.card.name} is available')
+
+        fewest = min(replica.outstanding for replica in candidates)
+        replica = random.choice([replica for replica in candidates if replica.outstanding == fewest])
+        if replica.tripped:
+            replica.trial = True
+        return replica
+
+    def hedge_delay(self) -> float | None:
+        # How long to wait before hedging: the recent p95 latency, or None if hedging is off or there's no estimate yet
+        if not self.hedging or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+        return max(p95, HEDGE_MIN_DELAY)
+
+    def hedge_stats(self) -> dict[str, Any]:
+        delay = self.hedge_delay()
+        return {"hedged": self.hedges, "hedge_won": self.hedge_wins,
+                "hedge_delay_seconds": round(delay, 2) if delay is not None else None}
+
     async def send_message(self, message_request: SendMessageRequest) -> SendMessageResponse:
-        return await self.agent_client.send_message(message_request)
+        # Answer within send_message_timeout, hedging a slow request to a second replica if enabled
+        tried: list[Replica] = []
+        attempts = [asyncio.create_task(self._send_with_failover(message_request, tried))]
+        try:
+            async with asyncio.timeout(self.send_message_timeout):
+                delay = self.hedge_delay()
+                if delay is not None:
+                    done, _ = await asyncio.wait(attempts, timeout=delay)
+                    now = time.monotonic()
+                    if not done and any(r.available(now) and r not in tried for r in self.replicas.values()):
+                        self.hedges += 1
+                        attempts.append(asyncio.create_task(self._send_with_failover(_duplicate(message_request), tried)))
+
+                # The first attempt to succeed wins; if one fails, wait for the other
+                pending = set(attempts)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for attempt in done:
+                        if attempt.exception() is None:
+                            if attempt is not attempts[0]:
+                                self.hedge_wins += 1
+                            return attempt.result()
+                raise attempts[0].exception()
+
+        except TimeoutError:
+            raise TimeoutError(f'{self.card.name} did not answer within {self.send_message_timeout}s') from None
+        finally:
+            # Don't wait for the losing (or timed-out) requests: they cancel and clean up in the background
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
+                    self._keep_until_done(attempt)
+
+    async def _send_with_failover(self, message_request: SendMessageRequest, tried: list[Replica]) -> SendMessageResponse:
+        # A server that refused the connection never saw the message, so it's safe to try another one
+        while True:
+            replica = self._pick_replica(tried)
+            tried.append(replica)
+            try:
+                return await self._send_to_replica(replica, message_request)
+            except Exception as e:
+                if len(tried) >= len(self.replicas) or not _connect_failed(e):
+                    raise
+
+    async def _send_to_replica(self, replica: Replica, message_request: SendMessageRequest) -> SendMessageResponse:
+        replica.outstanding += 1
+        start = time.monotonic()
+        try:
+            async with replica.slots:
+                if self.card.capabilities and self.card.capabilities.streaming:
+                    response = await self._send_message_streaming(replica, message_request)
+                else:
+                    response = await replica.agent_client.send_message(message_request)
+        except Exception:
+            replica.record_failure()
+            raise
+        except BaseException:
+            # Cancelled (for example, timed out by the caller): no verdict on the server's health
+            replica.trial = False
+            raise
+        finally:
+            replica.outstanding -= 1
+
+        replica.record_success()
+        self.latencies.append(time.monotonic() - start)
+        return response
+
+    async def _send_message_streaming(self, replica: Replica, message_request: SendMessageRequest) -> SendMessageResponse:
+        # Send with message/stream, passing each task update to the callback as it
+        # arrives, and return the finished task just like message/send would
+        stream_request = SendStreamingMessageRequest(id=message_request.id, params=message_request.params)
+        task_manager = ClientTaskManager()
+
+        try:
+            async for response in replica.agent_client.send_message_streaming(stream_request):
+                if not isinstance(response.root, SendStreamingMessageSuccessResponse):
+                    # A JSON-RPC error from the agent: pass it on, the same as a non-streaming reply
+                    return SendMessageResponse(root=response.root)
+
+                event = response.root.result
+                if isinstance(event, Message):
+                    return SendMessageResponse(root=SendMessageSuccessResponse(id=message_request.id, result=event))
+
+                await task_manager.process(event)
+                if self.task_callback:
+                    self.task_callback(event, self.card)
+
+        except asyncio.CancelledError:
+            # Lost a hedge or hit the deadline: ask the server to stop working on the task too
+            task = task_manager.get_task()
+            if task:
+                self._cancel_remote_task(replica, task.id)
+            raise
+
+        return SendMessageResponse(
+            root=SendMessageSuccessResponse(id=message_request.id, result=task_manager.get_task_or_raise())
+        )
+
+    def _cancel_remote_task(self, replica: Replica, task_id: str) -> None:
+        # Fire and forget: the caller has already moved on
+        async def cancel():
+            try:
+                await replica.agent_client.cancel_task(
+                    CancelTaskRequest(id=str(uuid.uuid4()), params=TaskIdParams(id=task_id))
+                )
+            except Exception:
+                pass  # the task may already be finished
+
+        self._keep_until_done(asyncio.create_task(cancel()))
+
+    def _keep_until_done(self, task: asyncio.Task) -> None:
+        # The event loop only holds weak references to tasks, so keep one until it finishes
+        self._cancellations.add(task)
+        task.add_done_callback(self._cancellations.discard)
+
+
+def _duplicate(message_request: SendMessageRequest) -> SendMessageRequest:
+    # A copy of the request with new ids, for a hedged request to another server
+    params = message_request.params.model_copy(deep=True)
+    params.message.message_id = str(uuid.uuid4())
+    return SendMessageRequest(id=params.message.message_id, params=params)
+
+
+class ConversationSession:
+    """One user's conversation: its thread, and a lock so its messages run one at a time."""
+
+    def __init__(self):
+        self.thread_id: str | None = None
+        self.lock = asyncio.Lock()
+        self.turns = 0
 
 class RoutingAgent:
 
-    def __init__(self,task_callback: TaskUpdateCallback | None = None):
+    def __init__(self,task_callback: TaskUpdateCallback | None = None, local_routing: bool = True,
+                 hedging: bool = False, send_message_timeout: float = SEND_MESSAGE_TIMEOUT):
 
         self.task_callback = task_callback
         self.remote_agent_connections: dict[str, RemoteAgentConnections] = {}
         self.cards: dict[str, AgentCard] = {}
         self.agents: str = ''
+        self.remote_agent_addresses: list[str] = []
+        self._card_cache: dict[str, tuple[AgentCard, float]] = {}  # address -> (card, time fetched)
+        self._card_refresh_task: asyncio.Task | None = None
+        self._health_check_task: asyncio.Task | None = None
+        self._unreachable: set[str] = set()  # addresses whose last card fetch failed
+
+        # Sends clear-cut messages straight to one agent, skipping the LLM run (rebuilt when the cards change)
+        self.local_routing = local_routing
+        self.local_router: LocalRouter | None = None
+        self.router_stats = RouterStats()
+        self.tool_output_stats = ToolOutputStats()
+
+        # Send slow requests to a second replica as well (see HEDGE_PERCENTILE)
+        self.hedging = hedging
+        self.send_message_timeout = send_message_timeout
+
+        # Shared, pooled HTTP client for talking to the remote agents
+        self.http_stats = HttpClientStats()
+        self.httpx_client = create_http_client(self.http_stats)
         
-        # Initialize Azure AI Agents client
+        # Initialize the async Azure AI Agents client, so waiting on a run
+        # doesn't block the server's event loop
+        self.credential = DefaultAzureCredential(
+            exclude_environment_credential=True,
+            exclude_managed_identity_credential=True
+        )
         self.agents_client = AgentsClient(
             endpoint=os.environ["PROJECT_ENDPOINT"],
-            credential=DefaultAzureCredential(
-                exclude_environment_credential=True,
-                exclude_managed_identity_credential=True
-            )
+            credential=self.credential
         )
 
         self.azure_agent = None
-        self.current_thread = None
+
+        # Conversations by session id, least recently used first
+        self.sessions: OrderedDict[str, ConversationSession] = OrderedDict()
+        self.sessions_evicted = 0
+        self.default_session = ConversationSession()
+        self._background_tasks: set[asyncio.Task] = set()
 
 
     @classmethod
-    async def create(cls, remote_agent_addresses: list[str], task_callback: TaskUpdateCallback | None = None) -> 'RoutingAgent':
+    async def create(cls, remote_agent_addresses: list[str], task_callback: TaskUpdateCallback | None = None,
+                     local_routing: bool = True, hedging: bool = False,
+                     send_message_timeout: float = SEND_MESSAGE_TIMEOUT) -> 'RoutingAgent':
         """Create and asynchronously initialize an instance of the RoutingAgent."""
-        instance = cls(task_callback)
+        instance = cls(task_callback, local_routing, hedging, send_message_timeout)
         await instance._async_init_components(remote_agent_addresses)
         return instance
     
@@ -87,24 +509,120 @@ class RoutingAgent:
     async def _async_init_components(self, remote_agent_addresses: list[str]) -> None:
         """Asynchronous part of initialization."""
 
-        # Use a single httpx.AsyncClient for all card resolutions for efficiency
-        async with httpx.AsyncClient(timeout=30) as client:
-            for address in remote_agent_addresses:
-                card_resolver = A2ACardResolver(client, address)
-                try:
-                    card = await card_resolver.get_agent_card()
+        self.remote_agent_addresses = list(remote_agent_addresses)
+        await self.refresh_cards()
+        print(f"Found remote agents: {self.list_remote_agents()}")
 
-                    remote_connection = RemoteAgentConnections(agent_card=card, agent_url=address)
-                    self.remote_agent_connections[card.name] = remote_connection
-                    self.cards[card.name] = card
+        # Keep the cards fresh in the background, so new or redeployed agents show up without a restart,
+        # and check each server's health so failing ones stop getting requests
+        self._card_refresh_task = asyncio.create_task(self._refresh_cards_periodically())
+        self._health_check_task = asyncio.create_task(self._check_health_periodically())
 
-                except httpx.ConnectError as e:
-                    print( f'ERROR: Failed to get agent card from {address}: {e}')
-                except Exception as e:  # Catch other potential errors
-                    print(f'ERROR: Failed to initialize connection for {address}: {e}')
-            print(f"Found remote agents: {self.list_remote_agents()}")
+    async def _fetch_card(self, address: str) -> AgentCard | None:
+        # Fetch one agent card with the shared client, giving up quickly on a slow or dead address
+        card_resolver = A2ACardResolver(self.httpx_client, address)
+        try:
+            card = await card_resolver.get_agent_card(http_kwargs={'timeout': CARD_FETCH_TIMEOUT})
+        except Exception as e:
+            # Report an address once when it goes down, not on every refresh
+            if address not in self._unreachable:
+                print(f'ERROR: Failed to get agent card from {address}: {e}')
+            self._unreachable.add(address)
+            return None
+        self._unreachable.discard(address)
+        return card
+
+    def _relay_task_update(self, event: TaskCallbackArg, card: AgentCard) -> None:
+        # Pass a streamed remote task update on to the routing agent's callback and the current request's listener
+        if self.task_callback:
+            self.task_callback(event, card)
+        listener = _task_listener.get()
+        if listener:
+            listener(event, card)
+
+    async def refresh_cards(self) -> bool:
+        """Fetch every remote agent's card at once. Returns True if the available agents changed."""
+        cards = await asyncio.gather(*(self._fetch_card(address) for address in self.remote_agent_addresses))
+
+        now = time.monotonic()
+        for address, card in zip(self.remote_agent_addresses, cards):
+            if card is not None:
+                self._card_cache[address] = (card, now)
+            elif address in self._card_cache and now - self._card_cache[address][1] > CARD_TTL:
+                del self._card_cache[address]
+
+        # Addresses whose cards share a name are replicas of one agent
+        cards: dict[str, AgentCard] = {}
+        addresses: dict[str, list[str]] = {}
+        for address, (card, _) in self._card_cache.items():
+            cards.setdefault(card.name, card)
+            addresses.setdefault(card.name, []).append(address)
+
+        # Keep each agent's existing connection, so its replicas keep their load and health
+        connections = {}
+        for name, card in cards.items():
+            connection = self.remote_agent_connections.get(name)
+            if connection is None:
+                connection = RemoteAgentConnections(
+                    agent_card=card, agent_urls=addresses[name], httpx_client=self.httpx_client,
+                    task_callback=self._relay_task_update, hedging=self.hedging,
+                    send_message_timeout=self.send_message_timeout
+                )
+            else:
+                connection.set_replicas(card, addresses[name])
+            connections[name] = connection
+
+        # Replicas' cards differ only in their url, which doesn't change what the agents offer
+        previous = {name: card.model_dump(exclude={'url'}) for name, card in self.cards.items()}
+        self.remote_agent_connections = connections
+        self.cards = cards
+        changed = {name: card.model_dump(exclude={'url'}) for name, card in cards.items()} != previous
+        if changed:
+            self.local_router = LocalRouter(list(self.cards.values()))
+        return changed
+
+    async def _refresh_cards_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(CARD_REFRESH_INTERVAL)
+            try:
+                if await self.refresh_cards():
+                    print(f"Remote agents changed: {self.list_remote_agents()}")
+                    await self._update_instructions()
+            except Exception as e:
+                print(f"ERROR: Failed to refresh remote agent cards: {e}")
 
     
+    async def _check_health_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            replicas = [replica for connection in self.remote_agent_connections.values()
+                        for replica in connection.replicas.values()]
+            try:
+                await asyncio.gather(*(self._check_health(replica) for replica in replicas))
+            except Exception as e:
+                # Keep checking; a round that fails shouldn't leave the breakers stuck
+                print(f"ERROR: Failed to check remote agent health: {e}")
+
+    async def _check_health(self, replica: Replica) -> None:
+        # A failed check counts toward tripping the breaker; a passing one can close it once the cooldown is over
+        try:
+            response = await self.httpx_client.get(f"{replica.url.rstrip('/')}/health", timeout=HEALTH_CHECK_TIMEOUT)
+            healthy = response.status_code == 200
+        except httpx.HTTPError:
+            healthy = False
+
+        if not healthy:
+            replica.record_failure()
+        elif time.monotonic() >= replica.open_until:
+            replica.record_success()
+
+    def replica_stats(self) -> dict[str, list[dict[str, Any]]]:
+        return {name: [replica.as_dict() for replica in connection.replicas.values()]
+                for name, connection in self.remote_agent_connections.items()}
+
+    def hedge_stats(self) -> dict[str, dict[str, Any]]:
+        return {name: connection.hedge_stats() for name, connection in self.remote_agent_connections.items()}
+
     async def send_message(self, agent_name: str, task: str):
         # Sends a task to remote agent.
 
@@ -145,16 +663,27 @@ class RoutingAgent:
         return send_response.root.result
 
 
-    def create_agent(self):
+    async def create_agent(self):
         # Create an Azure AI Agent instance
         
         try:
             # Create Azure AI Agent with the send_message function
             functions = FunctionTool({self.send_message})
-            self.azure_agent = self.agents_client.create_agent(
+            self.azure_agent = await self.agents_client.create_agent(
                 model=os.environ["MODEL_DEPLOYMENT_NAME"],
                 name="routing-agent",
-                instructions=f"""
+                instructions=self._instructions(),
+                tools=functions.definitions
+            )
+
+            return self.azure_agent
+            
+        except Exception as e:
+            print(f"Error creating Azure AI agent: {e}")
+            raise
+
+    def _instructions(self) -> str:
+        return f"""
                 You are an expert Routing Delegator for Caldova tech transfers.
 
                 Your role:
@@ -163,79 +692,175 @@ class RoutingAgent:
 
                 Available Agents: {self.list_remote_agents()}
 
-                Always be helpful and route requests to the most appropriate agent.""",
-                tools=functions.definitions
-            )
+                Always be helpful and route requests to the most appropriate agent."""
 
-            # Create a thread for conversation
-            self.current_thread = self.agents_client.threads.create()
+    async def _update_instructions(self):
+        # Tell the routing agent about the agents that are available now
+        if self.azure_agent:
+            self.azure_agent = await self.agents_client.update_agent(
+                self.azure_agent.id, instructions=self._instructions()
+            )
 
-            return self.azure_agent
-            
+    async def close(self):
+        # Stop refreshing cards and checking health, then close the HTTP client, the agents client, and its credential
+        for task in (self._card_refresh_task, self._health_check_task):
+            if task:
+                task.cancel()
+        print(f"Remote agent HTTP connections: {self.http_stats.as_dict()}")
+        print(f"Local routing: {self.router_stats.as_dict()}")
+        print(f"Tool output size: {self.tool_output_stats.as_dict()}")
+        await self.httpx_client.aclose()
+        await self.agents_client.close()
+        await self.credential.close()
+
+    def _session(self, session_id: str) -> ConversationSession:
+        # Get or start the session's conversation, dropping the least recently used idle ones past MAX_SESSIONS
+        if session_id == DEFAULT_SESSION_ID:
+            return self.default_session
+
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = ConversationSession()
+        self.sessions.move_to_end(session_id)
+
+        for old_id in list(self.sessions):
+            if len(self.sessions) <= MAX_SESSIONS:
+                break
+            old_session = self.sessions[old_id]
+            if old_id == session_id or old_session.lock.locked():
+                continue
+            del self.sessions[old_id]
+            self.sessions_evicted += 1
+            if old_session.thread_id:
+                self._delete_thread_later(old_session.thread_id)
+
+        return session
+
+    def _delete_thread_later(self, thread_id: str) -> None:
+        # Delete the thread in the background, without holding up the caller
+        task = asyncio.create_task(self._delete_thread(thread_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _delete_thread(self, thread_id: str) -> None:
+        try:
+            await self.agents_client.threads.delete(thread_id)
         except Exception as e:
-            print(f"Error creating Azure AI agent: {e}")
-            raise
+            print(f"ERROR: Failed to delete thread {thread_id}: {e}")
 
-    async def process_user_message(self, user_message: str) -> str:
+    def session_stats(self) -> dict[str, int]:
+        return {"active": len(self.sessions), "max": MAX_SESSIONS, "evicted": self.sessions_evicted}
+
+    async def process_user_message(self, user_message: str, session_id: str | None = None,
+                                   task_listener: TaskUpdateCallback | None = None) -> str:
+
+        # Remote agents' task updates during this request also go to task_listener
+        _task_listener.set(task_listener)
 
         if not hasattr(self, 'azure_agent') or not self.azure_agent:
             return "Azure AI Agent not initialized. Please ensure the agent is properly created."
-        
-        if not hasattr(self, 'current_thread') or not self.current_thread:
-            return "Azure AI Thread not initialized. Please ensure the agent is properly created."
+
+        # Each session has its own thread, so one user's context stays separate from everyone else's
+        session = self._session(session_id or DEFAULT_SESSION_ID)
+        async with session.lock:
+            # A conversation's first message skips the LLM run if it clearly belongs to one agent.
+            # Later messages can depend on earlier ones, so the routing agent always handles those.
+            response = None
+            if self.local_routing and session.turns == 0:
+                response = await self._route_locally(session, user_message)
+
+            if response is None:
+                start = time.perf_counter()
+                response = await self._run_in_session(session, user_message)
+                self.router_stats.record_llm(time.perf_counter() - start)
+
+            session.turns += 1
+            return response
+
+    async def _route_locally(self, session: ConversationSession, user_message: str) -> str | None:
+        # Send the message straight to the agent the local router picks, and record the
+        # exchange in the session's thread. Returns None to fall back to the LLM run.
+        agent_name, confidence = self.local_router.route(user_message) if self.local_router else (None, 0.0)
+        if agent_name is None:
+            return None
+
+        start = time.perf_counter()
+        try:
+            task = await self.send_message(agent_name=agent_name, task=user_message)
+        except Exception as e:
+            print(f"Local routing to {agent_name} failed, using the routing agent instead: {e}")
+            return None
+        answer = task_text(task) if task and task.status.state == TaskState.completed else ""
+        if not answer:
+            return None
+
+        # The agent has answered, so don't fall back (and delegate again) if the thread write fails
+        try:
+            if session.thread_id is None:
+                session.thread_id = (await self.agents_client.threads.create()).id
+            await self.agents_client.messages.create(thread_id=session.thread_id, role=MessageRole.USER, content=user_message)
+            await self.agents_client.messages.create(thread_id=session.thread_id, role=MessageRole.AGENT, content=answer)
+        except Exception as e:
+            # This is the session's first turn: drop the half-written thread, and the next turn starts a new one
+            print(f"ERROR: Failed to record the local answer in the session's thread: {e}")
+            if session.thread_id is not None:
+                self._delete_thread_later(session.thread_id)
+                session.thread_id = None
+
+        self.router_stats.record_local(time.perf_counter() - start)
+        print(f"Routed locally to {agent_name} (confidence {confidence:.2f})")
+        return answer
+
+    async def _run_in_session(self, session: ConversationSession, user_message: str) -> str:
         
         try:
+            # Create the session's thread on its first message
+            if session.thread_id is None:
+                session.thread_id = (await self.agents_client.threads.create()).id
+            thread_id = session.thread_id
+
             # Create message in the thread
-            self.agents_client.messages.create(
-                thread_id=self.current_thread.id, 
+            await self.agents_client.messages.create(
+                thread_id=thread_id, 
                 role=MessageRole.User, 
                 content=user_message
             )
 
             # Create and run the agent
-            run = self.agents_client.runs.create(
-                thread_id=self.current_thread.id, 
+            run = await self.agents_client.runs.create(
+                thread_id=thread_id, 
                 agent_id=self.azure_agent.id
             )
             
-            # Need to await send_message function
+            # Poll the run without blocking the event loop, backing off while it works
+            delay = RUN_POLL_INITIAL
             while run.status in ["queued", "in_progress", "requires_action"]:
-                time.sleep(1)
-                run = self.agents_client.runs.get(thread_id=self.current_thread.id, run_id=run.id)
+                await asyncio.sleep(delay)
+                delay = min(delay * RUN_POLL_BACKOFF, RUN_POLL_MAX)
+                run = await self.agents_client.runs.get(thread_id=thread_id, run_id=run.id)
 
                 if run.status == "requires_action":
                     tool_calls = run.required_action.submit_tool_outputs.tool_calls
-                    tool_outputs = []
-                    
-                    for tool_call in tool_calls:
-                        function_name = tool_call.function.name
-                        function_args = json.loads(tool_call.function.arguments)
-                        
-                        if function_name == "send_message":
-                            try:
-                                result = await self.send_message(agent_name=function_args["agent_name"], task=function_args["task"])
-                                output = json.dumps(result.model_dump() if hasattr(result, 'model_dump') else str(result))
-
-                            except Exception as e:
-                                output = json.dumps({"error": str(e)})
-                        else:
-                            output = json.dumps({"error": f"Unknown function: {function_name}"})
-                        
-                        tool_outputs.append({"tool_call_id": tool_call.id,  "output": output})
+
+                    # Delegate to every remote agent at once, so the wait is the slowest agent, not the sum
+                    tool_outputs = await asyncio.gather(*(self._call_tool(tool_call) for tool_call in tool_calls))
                 
-                    # Submit the tool outputs
-                    self.agents_client.runs.submit_tool_outputs(
-                        thread_id=self.current_thread.id, run_id=run.id, tool_outputs=tool_outputs
+                    # Submit the tool outputs together
+                    run = await self.agents_client.runs.submit_tool_outputs(
+                        thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
                     )
 
+                    # The run picks up again right away, so check back soon
+                    delay = RUN_POLL_INITIAL
+
             if run.status == "failed":
                 error_info = f"Run error: {run.last_error}"
                 print(error_info)
                 return f"Error processing request: {error_info}"
 
             # Return the response
-            messages = self.agents_client.messages.list(thread_id=self.current_thread.id, order=ListSortOrder.DESCENDING)
-            for msg in messages:
+            messages = self.agents_client.messages.list(thread_id=thread_id, order=ListSortOrder.DESCENDING)
+            async for msg in messages:
                 if msg.role == MessageRole.AGENT and msg.text_messages:
                     last_text = msg.text_messages[-1]
                     return last_text.text.value
@@ -247,24 +872,25 @@ class RoutingAgent:
             print(error_msg)
             return f"An error occurred while processing your message."
 
+    async def _call_tool(self, tool_call) -> dict[str, str]:
+        # Run one tool call, turning a timeout or error into an output the model can read
 
-async def _get_initialized_routing_agent_sync() -> RoutingAgent:
+        function_name = tool_call.function.name
 
-    async def _async_main() -> RoutingAgent:
-        routing_agent_instance = await RoutingAgent.create(
-            remote_agent_addresses=[
-                f"http://{os.environ["SERVER_URL"]}:{os.environ["TITLE_AGENT_PORT"]}",
-                f"http://{os.environ["SERVER_URL"]}:{os.environ["OUTLINE_AGENT_PORT"]}",
-            ]
-        )
-        # Create the Azure AI agent
-        routing_agent_instance.create_agent()
-        return routing_agent_instance
+        if function_name == "send_message":
+            try:
+                function_args = json.loads(tool_call.function.arguments)
+                result = await self.send_message(agent_name=function_args["agent_name"], task=function_args["task"])
+                if isinstance(result, Task):
+                    # Pass on only the final answer, not the whole task
+                    output = json.dumps(project_task(result))
+                    self.tool_output_stats.record(json.dumps(result.model_dump()), output)
+                else:
+                    output = json.dumps({"error": "The remote agent didn't return a task."})
 
-    try:
-        return asyncio.run(_async_main())
-    except RuntimeError as e:
-        raise
+            except Exception as e:
+                output = json.dumps({"error": str(e)})
+        else:
+            output = json.dumps({"error": f"Unknown function: {function_name}"})
 
-# Initialize the routing agent
-routing_agent = _get_initialized_routing_agent_sync()
+        return {"tool_call_id": tool_call.id, "output": output}
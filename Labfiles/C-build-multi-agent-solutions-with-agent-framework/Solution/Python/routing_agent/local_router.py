@@ -0,0 +1,129 @@
+""" Local fast-path router that picks a remote agent from the agent cards, without an LLM run """
+
+import math
+import re
+from collections import Counter
+
+from a2a.types import AgentCard
+
+# Share of the total match score the best agent needs before a message is sent
+# straight to it. A message that matches two agents ("a title and an outline")
+# stays below this and goes to the routing agent's LLM instead.
+CONFIDENCE_THRESHOLD = 0.8
+
+# Lowest match score worth acting on. One tag-level keyword ('title',
+# 'outline') is enough; a couple of words that only appear in an example
+# ('Ashford', 'packaging') are not.
+MIN_SCORE = 2.0
+
+# How much each part of a card counts. Tags and skill names say what an agent
+# is for; examples mostly add incidental words (sites, products).
+NAME_WEIGHT = 2
+TAG_WEIGHT = 3
+SKILL_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+EXAMPLE_WEIGHT = 0.25
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "could", "do", "for", "from", "give",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "that", "the", "this", "to",
+    "us", "we", "what", "with", "you", "your",
+}
+
+
+def stem(word: str) -> str:
+    # Strip a common English suffix, so 'titles' matches 'title'
+    for suffix in ("ing", "ed", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOP_WORDS]
+
+
+def card_terms(card: AgentCard) -> Counter:
+    """Weighted term counts for everything an agent card says about the agent."""
+    terms = Counter()
+
+    def add(text: str | None, weight: float) -> None:
+        for term in tokenize(text or ""):
+            terms[term] += weight
+
+    add(card.name, NAME_WEIGHT)
+    add(card.description, DESCRIPTION_WEIGHT)
+    for skill in card.skills or []:
+        add(skill.name, SKILL_WEIGHT)
+        add(skill.description, DESCRIPTION_WEIGHT)
+        for tag in skill.tags or []:
+            add(tag, TAG_WEIGHT)
+        for example in skill.examples or []:
+            add(example, EXAMPLE_WEIGHT)
+    return terms
+
+
+class LocalRouter:
+    """Scores a message against each agent card (TF-IDF) and picks an agent when one clearly wins."""
+
+    def __init__(self, cards: list[AgentCard]):
+        documents = {card.name: card_terms(card) for card in cards}
+        document_frequency = Counter(term for terms in documents.values() for term in terms)
+        count = len(documents)
+
+        # A term every agent shares (like 'transfer') says nothing about which
+        # agent to pick, so its weight is log(1) = 0.
+        self.weights = {
+            name: {
+                term: (1 + math.log1p(weight)) * math.log(count / document_frequency[term])
+                for term, weight in terms.items()
+            }
+            for name, terms in documents.items()
+        }
+
+    def route(self, message: str) -> tuple[str | None, float]:
+        """Return (agent name, confidence), with no agent name if the message is ambiguous."""
+        terms = set(tokenize(message))
+        scores = {name: sum(weights.get(term, 0.0) for term in terms) for name, weights in self.weights.items()}
+        total = sum(scores.values())
+        if not total:
+            return None, 0.0
+
+        name, best = max(scores.items(), key=lambda item: item[1])
+        confidence = best / total
+        if best < MIN_SCORE or confidence < CONFIDENCE_THRESHOLD:
+            return None, confidence
+        return name, confidence
+
+
+class RouterStats:
+    """How many messages skipped the LLM run, and roughly how much time that saved."""
+
+    def __init__(self):
+        self.local = 0
+        self.local_seconds = 0.0
+        self.llm = 0
+        self.llm_seconds = 0.0
+
+    def record_local(self, seconds: float) -> None:
+        self.local += 1
+        self.local_seconds += seconds
+
+    def record_llm(self, seconds: float) -> None:
+        self.llm += 1
+        self.llm_seconds += seconds
+
+    def as_dict(self) -> dict[str, float]:
+        asked = self.local + self.llm
+        average_local = self.local_seconds / self.local if self.local else 0.0
+        average_llm = self.llm_seconds / self.llm if self.llm else 0.0
+        # Each local answer saved about the difference from an average LLM-routed answer
+        saved = self.local * max(average_llm - average_local, 0.0) if self.llm else 0.0
+        return {
+            "routed_locally": self.local,
+            "routed_by_llm": self.llm,
+            "hit_rate": round(self.local / asked, 2) if asked else 0.0,
+            "average_local_seconds": round(average_local, 2),
+            "average_llm_seconds": round(average_llm, 2),
+            "estimated_seconds_saved": round(saved, 1),
+        }
@@ -39,7 +39,7 @@ agent_card = AgentCard(
     version='1.0.0',
     default_input_modes=['text'],
     default_output_modes=['text'],
-    capabilities=AgentCapabilities(),
+    capabilities=AgentCapabilities(streaming=True),
     skills=skills,
 )
 
@@ -18,6 +18,11 @@ It:
   * grounds it on the Caldova knowledge docs with the File Search tool
   * writes AGENT_NAME=caldova-knowledge-agent into Python/.env
 
+Edited a knowledge doc? Re-run with --sync. It uploads only the docs whose
+content changed (tracked in Python/.vector_store_manifest.json), removes docs
+you deleted, and keeps the existing vector store, so the agent picks up the
+edit without a full re-index.
+
 Prerequisites: PROJECT_ENDPOINT and MODEL_DEPLOYMENT_NAME set in Python/.env
 (run 'azd up', or fill them in from the portal), and 'az login' completed.
 
@@ -28,9 +33,13 @@ and 3 — and the code you write — is the same either way.
 """
 
 import argparse
+import hashlib
+import json
 import os
+import random
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from azure.ai.projects import AIProjectClient
@@ -41,6 +50,7 @@ from azure.ai.projects.models import (
 from azure.core.exceptions import ResourceNotFoundError
 from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
+from openai import NotFoundError
 
 AGENT_NAME = "caldova-knowledge-agent"
 
@@ -58,6 +68,8 @@ Guidelines:
 LAB_ROOT = Path(__file__).resolve().parent.parent
 PYTHON_DIR = LAB_ROOT / "Python"
 ENV_PATH = PYTHON_DIR / ".env"
+# Which vector store holds the docs, and the hash and file id of each doc in it (for --sync).
+MANIFEST_PATH = PYTHON_DIR / ".vector_store_manifest.json"
 DATA_DIR = PYTHON_DIR / "knowledge"
 
 
@@ -68,32 +80,172 @@ def fail(message):
 
 def upload_file(openai_client, path):
     """Upload a local file and return its file id."""
-    if not path.exists():
-        fail(f"Expected data file not found: {path}")
     print(f"  Uploading {path.name} ...")
     with open(path, "rb") as handle:
         uploaded = openai_client.files.create(file=handle, purpose="assistants")
     return uploaded.id
 
 
-def build_vector_store(openai_client, file_ids):
+def upload_files(openai_client, paths, workers):
+    """Upload files a few at a time and return their ids, in the same order."""
+    for path in paths:
+        if not path.exists():
+            fail(f"Expected data file not found: {path}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda path: upload_file(openai_client, path), paths))
+
+
+def build_vector_store(openai_client, file_ids, timeout):
     """Create a vector store for File Search and wait until it's indexed."""
     print("  Creating vector store for the Caldova knowledge base ...")
     vector_store = openai_client.vector_stores.create(
         name="ks-caldovaproducts",
         file_ids=file_ids,
     )
+    if not wait_until_indexed(openai_client, vector_store.id, timeout):
+        print("  The agent is created anyway; File Search results appear once indexing completes.")
+    return vector_store.id
+
 
-    # Wait for the files to finish indexing so the agent can search them immediately.
-    for _ in range(30):
-        current = openai_client.vector_stores.retrieve(vector_store_id=vector_store.id)
+def wait_until_indexed(openai_client, vector_store_id, timeout, batch_id=None):
+    """Poll until the vector store (or one file batch in it) finishes indexing.
+
+    Small stores are usually ready within a second or two, so the first checks
+    come quickly; the wait then doubles (up to 10 seconds), with random jitter,
+    until *timeout* seconds have passed. Returns True once indexing completes,
+    or False if it's still running at the timeout.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while True:
+        if batch_id:
+            current = openai_client.vector_stores.file_batches.retrieve(
+                batch_id=batch_id, vector_store_id=vector_store_id
+            )
+        else:
+            current = openai_client.vector_stores.retrieve(vector_store_id=vector_store_id)
         if current.status == "completed":
-            break
-        if current.status == "failed":
+            return True
+        if current.status in ("failed", "cancelled"):
             fail("Vector store indexing failed. Check the uploaded files and try again.")
-        time.sleep(2)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"  WARNING: still indexing after {timeout:.0f}s.")
+            return False
+        time.sleep(min(remaining, random.uniform(delay / 2, delay)))
+        delay = min(delay * 2, 10)
 
-    return vector_store.id
+
+def file_hash(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def load_manifest(project_endpoint):
+    """Return the saved manifest for this project, or None if there isn't one."""
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("project_endpoint") == project_endpoint else None
+
+
+def save_manifest(project_endpoint, vector_store_id, files, retired=()):
+    manifest = {
+        "project_endpoint": project_endpoint,
+        "vector_store_id": vector_store_id,
+        "files": files,
+        "retired": list(retired),
+    }
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+
+
+def ground_from_scratch(openai_client, data_files, project_endpoint, args):
+    """Upload every doc into a new vector store, record it in the manifest, and return its id."""
+    started = time.perf_counter()
+    file_ids = upload_files(openai_client, data_files, args.upload_workers)
+    print(f"  Uploaded {len(file_ids)} documents in {time.perf_counter() - started:.1f}s.")
+
+    started = time.perf_counter()
+    vector_store_id = build_vector_store(openai_client, file_ids, args.index_timeout)
+    print(f"  Vector store ready in {time.perf_counter() - started:.1f}s.")
+
+    files = {
+        path.name: {"sha256": file_hash(path), "file_id": file_id}
+        for path, file_id in zip(data_files, file_ids)
+    }
+    save_manifest(project_endpoint, vector_store_id, files)
+    return vector_store_id
+
+
+def remove_file(openai_client, vector_store_id, file_id):
+    """Detach a file from the vector store and delete it, ignoring it if it's already gone."""
+    try:
+        openai_client.vector_stores.files.delete(file_id=file_id, vector_store_id=vector_store_id)
+    except NotFoundError:
+        pass
+    try:
+        openai_client.files.delete(file_id)
+    except NotFoundError:
+        pass
+
+
+def sync_vector_store(openai_client, data_files, project_endpoint, args):
+    """Bring the manifest's vector store up to date, uploading only docs that changed.
+
+    Returns (vector_store_id, created), where created is True if there was no
+    usable store and a new one had to be built.
+    """
+    manifest = load_manifest(project_endpoint)
+    if manifest:
+        try:
+            openai_client.vector_stores.retrieve(vector_store_id=manifest["vector_store_id"])
+        except NotFoundError:
+            manifest = None
+    if manifest is None:
+        print("  No vector store recorded for this project yet - building one.")
+        return ground_from_scratch(openai_client, data_files, project_endpoint, args), True
+
+    vector_store_id, files = manifest["vector_store_id"], manifest["files"]
+    # Old file versions a previous sync kept because their replacements weren't indexed yet
+    retired = manifest.get("retired", [])
+    hashes = {path.name: file_hash(path) for path in data_files}
+    changed = [path for path in data_files if files.get(path.name, {}).get("sha256") != hashes[path.name]]
+    stale = [name for name, entry in files.items() if hashes.get(name) != entry["sha256"]]
+    if not changed and not stale and not retired:
+        print(f"  All {len(data_files)} documents are up to date in {vector_store_id}.")
+        return vector_store_id, False
+
+    started = time.perf_counter()
+    replaced = {name: files.pop(name)["file_id"] for name in stale}
+    # Index the new versions before removing the old ones, so search never misses a doc.
+    if changed:
+        file_ids = upload_files(openai_client, changed, args.upload_workers)
+        batch = openai_client.vector_stores.file_batches.create(vector_store_id=vector_store_id, file_ids=file_ids)
+        for path, file_id in zip(changed, file_ids):
+            files[path.name] = {"sha256": hashes[path.name], "file_id": file_id}
+        indexed = wait_until_indexed(openai_client, vector_store_id, args.index_timeout, batch_id=batch.id)
+    else:
+        indexed = wait_until_indexed(openai_client, vector_store_id, args.index_timeout)
+
+    if indexed:
+        for name, file_id in replaced.items():
+            print(f"  Removing the old {name} ...")
+            remove_file(openai_client, vector_store_id, file_id)
+        if retired:
+            print("  Removing the old document versions left by an earlier sync ...")
+        for file_id in retired:
+            remove_file(openai_client, vector_store_id, file_id)
+        retired = []
+    else:
+        print("  Keeping the old document versions until the new ones are indexed; "
+              "run --sync again later to remove them.")
+        retired = retired + list(replaced.values())
+    save_manifest(project_endpoint, vector_store_id, files, retired)
+
+    removed = len([name for name in stale if name not in hashes])
+    print(f"  Synced {len(changed)} new or changed and {removed} removed documents "
+          f"in {time.perf_counter() - started:.1f}s.")
+    return vector_store_id, False
 
 
 def agent_exists(project_client):
@@ -128,6 +280,24 @@ def main():
         action="store_true",
         help="Create a new version even if the agent already exists.",
     )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Update the existing vector store with only the docs that changed, instead of "
+             "uploading everything to a new one.",
+    )
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=4,
+        help="How many documents to upload at once (default 4).",
+    )
+    parser.add_argument(
+        "--index-timeout",
+        type=float,
+        default=120,
+        help="Seconds to wait for the vector store to finish indexing (default 120).",
+    )
     args = parser.parse_args()
 
     load_dotenv(ENV_PATH)
@@ -149,20 +319,31 @@ def main():
         AIProjectClient(endpoint=project_endpoint, credential=credential) as project_client,
         project_client.get_openai_client() as openai_client,
     ):
-        if agent_exists(project_client) and not args.force:
+        existing_agent = agent_exists(project_client)
+        if existing_agent and not args.force and not args.sync:
             print(f"\nAgent '{AGENT_NAME}' already exists - nothing to do.")
-            print("Re-run with --force to add a new grounded version.")
+            print("Re-run with --force to add a new grounded version, or --sync to update its documents.")
             set_env_value("AGENT_NAME", AGENT_NAME)
             print(f"Ensured AGENT_NAME={AGENT_NAME} in {ENV_PATH}")
             return
 
-        print(f"Grounding the agent (this uploads {len(data_files)} knowledge documents):")
-        file_ids = [upload_file(openai_client, path) for path in data_files]
-        vector_store_id = build_vector_store(openai_client, file_ids)
+        if args.sync:
+            print(f"Syncing {len(data_files)} knowledge documents with the vector store:")
+            vector_store_id, created = sync_vector_store(openai_client, data_files, project_endpoint, args)
+            if existing_agent and not created and not args.force:
+                # The agent already searches this store, so the synced docs are live.
+                print(f"\nAgent '{AGENT_NAME}' already uses this vector store - no new version needed.")
+                set_env_value("AGENT_NAME", AGENT_NAME)
+                print(f"Ensured AGENT_NAME={AGENT_NAME} in {ENV_PATH}")
+                return
+        else:
+            print(f"Grounding the agent (this uploads {len(data_files)} knowledge documents):")
+            vector_store_id = ground_from_scratch(openai_client, data_files, project_endpoint, args)
 
         file_search = FileSearchTool(vector_store_ids=[vector_store_id])
 
         print("Creating the agent ...")
+        started = time.perf_counter()
         agent = project_client.agents.create_version(
             agent_name=AGENT_NAME,
             definition=PromptAgentDefinition(
@@ -171,7 +352,7 @@ def main():
                 tools=[file_search],
             ),
         )
-        print(f"  Created '{agent.name}' (version {agent.version}).")
+        print(f"  Created '{agent.name}' (version {agent.version}) in {time.perf_counter() - started:.1f}s.")
 
     set_env_value("AGENT_NAME", AGENT_NAME)
     print(f"\nWrote AGENT_NAME={AGENT_NAME} to {ENV_PATH}")
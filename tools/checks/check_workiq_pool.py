@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tier 1: check that Lab B's Work IQ session pool fails fast instead of hanging.
+
+Lab B's workiq_mcp.py keeps MCP sessions with the Work IQ server open and runs
+a turn's tool calls at once. When the server can't start - Node isn't
+installed, or Work IQ isn't signed in - every one of those calls has to come
+back with an error. A call that waits forever for a session that will never
+open hangs the whole lab.
+
+This starts the pool against a missing command, a server that exits straight
+away, and a small working MCP server, and makes several calls at once against
+each. It needs the lab's requirements (for `mcp`) but no Azure resources, so
+it runs with the SDK contract check.
+
+Usage:
+    python check_workiq_pool.py
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import textwrap
+import threading
+from pathlib import Path
+
+from common import Reporter, main_guard, repo_root
+
+LAB = "B-integrate-agents-with-enterprise-knowledge-and-m365"
+
+# Per-call timeout handed to the pool, and how long the check waits for
+# call_tools before calling it a hang.
+CALL_TIMEOUT = 10
+HANG_AFTER = 30
+
+CONCURRENT_CALLS = 3
+
+WORKING_SERVER = textwrap.dedent('''
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("check")
+
+    @mcp.tool()
+    def echo(text: str) -> str:
+        """Return the text."""
+        return text
+
+    mcp.run()
+''')
+
+
+def call_all(pool_module, command: str, args: list[str]):
+    """Run CONCURRENT_CALLS tool calls at once. Returns their results, or None if they hang."""
+    from mcp import StdioServerParameters
+
+    pool = pool_module.WorkIQSessionPool(StdioServerParameters(command=command, args=args))
+    pool.start()
+    calls = [("echo", {"text": str(n)}) for n in range(CONCURRENT_CALLS)]
+    results = []
+    worker = threading.Thread(
+        target=lambda: results.extend(pool.call_tools(calls, timeout=CALL_TIMEOUT)), daemon=True
+    )
+    worker.start()
+    worker.join(HANG_AFTER)
+    if worker.is_alive():
+        return None  # leave the pool's daemon thread behind rather than hang on close()
+    pool.close()
+    return results
+
+
+def text_of(result) -> str | None:
+    content = getattr(result, "content", None)
+    return content[0].text if content else None
+
+
+def check_copy(r: Reporter, python_dir: Path, server_script: Path) -> None:
+    path = python_dir / "workiq_mcp.py"
+    sys.path.insert(0, str(python_dir))
+    try:
+        sys.modules.pop("workiq_mcp", None)
+        import workiq_mcp
+    finally:
+        sys.path.pop(0)
+
+    failing = {
+        "a missing command": ("/nonexistent/workiq", []),
+        "a server that exits at once": (sys.executable, ["-c", "raise SystemExit(1)"]),
+    }
+    for name, (command, args) in failing.items():
+        r.checked += 1
+        results = call_all(workiq_mcp, command, args)
+        if results is None:
+            r.add(path, f"call_tools hung with {name} (no result after {HANG_AFTER}s)")
+        elif not all(isinstance(result, Exception) for result in results):
+            r.add(path, f"call_tools with {name} returned {results!r}, expected an error for each call")
+
+    r.checked += 1
+    results = call_all(workiq_mcp, sys.executable, [str(server_script)])
+    if results is None:
+        r.add(path, f"call_tools hung against a working server (no result after {HANG_AFTER}s)")
+    elif [text_of(result) for result in results] != [str(n) for n in range(CONCURRENT_CALLS)]:
+        r.add(path, f"call_tools against a working server returned {results!r}")
+
+
+def check() -> int:
+    r = Reporter("Work IQ session pool")
+    lab = repo_root() / "Labfiles" / LAB
+    with tempfile.TemporaryDirectory() as tmp:
+        server_script = Path(tmp) / "server.py"
+        server_script.write_text(WORKING_SERVER, encoding="utf-8")
+        for python_dir in (lab / "Python", lab / "Solution" / "Python"):
+            check_copy(r, python_dir, server_script)
+    return r.finish("scenarios")
+
+
+if __name__ == "__main__":
+    main_guard(check)